@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Synthetic recipe catalogs in the US_recipes.json dump format.
+
+Records have the same keys and value shapes as the real dump (nutrient
+strings with units, ingredient and instruction lists, NaN ratings, the
+"Contient" typo) and are deterministic for a given seed. The file is written
+incrementally, so even a 1M-recipe catalog never sits in memory:
+
+    python -m benchmarks.catalog --size 100k -o /tmp/catalog_100k.json
+"""
+import argparse
+import json
+import math
+import random
+import sys
+
+
+CUISINES = [
+    ('Italian', 'Europe', 'Italy'),
+    ('French', 'Europe', 'France'),
+    ('Greek', 'Europe', 'Greece'),
+    ('Spanish', 'Europe', 'Spain'),
+    ('German', 'Europe', 'Germany'),
+    ('Mexican', 'North America', 'Mexico'),
+    ('Southern Recipes', 'North America', 'US'),
+    ('Cajun and Creole', 'North America', 'Louisiana'),
+    ('Tex-Mex', 'North America', 'Texas'),
+    ('Canadian', 'North America', 'Canada'),
+    ('Brazilian', 'South America', 'Brazil'),
+    ('Peruvian', 'South America', 'Peru'),
+    ('Indian', 'Asia', 'India'),
+    ('Thai', 'Asia', 'Thailand'),
+    ('Chinese', 'Asia', 'China'),
+    ('Japanese', 'Asia', 'Japan'),
+    ('Korean', 'Asia', 'Korea'),
+    ('Moroccan', 'Africa', 'Morocco'),
+    ('Ethiopian', 'Africa', 'Ethiopia'),
+    ('Australian and New Zealander', 'Oceania', 'Australia'),
+]
+
+INGREDIENTS = [
+    'all-purpose flour', 'white sugar', 'brown sugar', 'butter', 'eggs', 'milk', 'heavy cream',
+    'olive oil', 'vegetable oil', 'salt', 'black pepper', 'garlic', 'onion', 'red onion',
+    'shallots', 'tomatoes', 'tomato paste', 'chicken breasts', 'chicken thighs', 'ground beef',
+    'pork shoulder', 'bacon', 'shrimp', 'salmon fillets', 'cod', 'tofu', 'black beans',
+    'chickpeas', 'lentils', 'white rice', 'basmati rice', 'spaghetti', 'penne pasta',
+    'potatoes', 'sweet potatoes', 'carrots', 'celery', 'bell pepper', 'jalapeno pepper',
+    'spinach', 'kale', 'zucchini', 'mushrooms', 'broccoli', 'cauliflower', 'corn kernels',
+    'green peas', 'lemon juice', 'lime juice', 'fresh ginger', 'soy sauce', 'fish sauce',
+    'coconut milk', 'chicken broth', 'vegetable broth', 'cheddar cheese', 'parmesan cheese',
+    'mozzarella cheese', 'feta cheese', 'cream cheese', 'sour cream', 'plain yogurt', 'honey',
+    'maple syrup', 'vanilla extract', 'baking powder', 'baking soda', 'ground cinnamon',
+    'ground cumin', 'paprika', 'chili powder', 'dried oregano', 'fresh basil', 'fresh cilantro',
+    'fresh parsley', 'thyme', 'rosemary', 'bay leaves', 'walnuts', 'almonds', 'peanut butter',
+    'dark chocolate', 'cocoa powder', 'apples', 'bananas', 'blueberries', 'strawberries',
+]
+
+UNITS = ['cup', 'cups', 'tablespoon', 'tablespoons', 'teaspoon', 'teaspoons', 'pound', 'ounces', 'cloves', '']
+QUANTITIES = ['1', '2', '3', '4', '1/2', '1/4', '3/4', '1 1/2', '6', '8']
+
+ADJECTIVES = [
+    'Easy', 'Classic', 'Quick', 'Spicy', 'Creamy', 'Crispy', 'Grandma\'s', 'Slow Cooker',
+    'Roasted', 'Grilled', 'Baked', 'Healthy', 'One-Pot', 'Homemade', 'Simple', 'Best',
+]
+DISHES = [
+    'Pie', 'Casserole', 'Soup', 'Stew', 'Curry', 'Salad', 'Tacos', 'Lasagna', 'Stir-Fry',
+    'Risotto', 'Bread', 'Cake', 'Cookies', 'Muffins', 'Chili', 'Pasta', 'Skillet', 'Bowl',
+]
+WORDS = (
+    'this recipe is a family favorite that comes together quickly with simple pantry staples '
+    'and fresh seasonal produce serve it warm with a side salad or crusty bread for a '
+    'satisfying weeknight dinner leftovers keep well in the refrigerator for several days'
+).split()
+
+STEPS = [
+    'Preheat the oven to {t} degrees F ({c} degrees C).',
+    'Heat {i} in a large skillet over medium heat.',
+    'Stir in {i} and cook until softened, about {m} minutes.',
+    'Whisk {i} and {j} together in a bowl until smooth.',
+    'Transfer to a baking dish and bake until golden, {m} to {n} minutes.',
+    'Season with salt and pepper to taste.',
+    'Let cool for {m} minutes before serving.',
+]
+
+
+def parse_size(value):
+    """
+    Parse a catalog size such as 10000, 10k, 100k or 1M.
+    """
+    text = str(value).strip().lower()
+    multiplier = 1
+    if text.endswith('k'):
+        multiplier, text = 1000, text[:-1]
+    elif text.endswith('m'):
+        multiplier, text = 1000000, text[:-1]
+    try:
+        size = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Invalid size: {value}')
+    if size < 1:
+        raise argparse.ArgumentTypeError('Size must be positive')
+    return size
+
+
+def _nutrient(rng, mean, spread, unit, missing=0.05):
+    if rng.random() < missing:
+        return None
+    value = max(0.0, rng.lognormvariate(math.log(mean), spread))
+    return f'{value:.0f} {unit}' if value >= 10 else f'{value:.1f} {unit}'
+
+
+def synthetic_recipe(rng, index):
+    """
+    One raw recipe record as found in the JSON dump.
+    """
+    cuisine, continent, country = rng.choice(CUISINES)
+    prep_time = rng.choice([5, 10, 15, 20, 25, 30, 45, None])
+    cook_time = rng.choice([0, 10, 15, 20, 30, 45, 60, 90, 120, 240, None])
+    total_time = (prep_time or 0) + (cook_time or 0) + rng.choice([0, 0, 0, 10, 30, 60])
+
+    nutrients = {
+        'calories': _nutrient(rng, 350, 0.5, 'kcal', missing=0.03),
+        'carbohydrateContent': _nutrient(rng, 35, 0.6, 'g'),
+        'cholesterolContent': _nutrient(rng, 45, 0.9, 'mg'),
+        'fiberContent': _nutrient(rng, 3, 0.7, 'g'),
+        'proteinContent': _nutrient(rng, 15, 0.7, 'g'),
+        'saturatedFatContent': _nutrient(rng, 6, 0.8, 'g'),
+        'sodiumContent': _nutrient(rng, 500, 0.7, 'mg'),
+        'sugarContent': _nutrient(rng, 9, 0.9, 'g'),
+        'fatContent': _nutrient(rng, 16, 0.6, 'g'),
+        'unsaturatedFatContent': _nutrient(rng, 9, 0.7, 'g', missing=0.3),
+    }
+    nutrients = {name: value for name, value in nutrients.items() if value is not None}
+
+    ingredients = []
+    for name in rng.sample(INGREDIENTS, rng.randint(4, 15)):
+        unit = rng.choice(UNITS)
+        ingredients.append(' '.join(part for part in (rng.choice(QUANTITIES), unit, name) if part))
+
+    instructions = []
+    for step in rng.sample(STEPS, rng.randint(3, len(STEPS))):
+        m = rng.randint(2, 30)
+        instructions.append(step.format(
+            t=rng.choice([325, 350, 375, 400, 425]), c=rng.choice([165, 175, 190, 200, 220]),
+            i=rng.choice(INGREDIENTS), j=rng.choice(INGREDIENTS), m=m, n=m + rng.randint(5, 20),
+        ))
+
+    return {
+        'Contient': continent,
+        'Country_State': country,
+        'cuisine': cuisine,
+        'title': f' {rng.choice(ADJECTIVES)} {rng.choice(INGREDIENTS).title()} {rng.choice(DISHES)} {index} ',
+        'URL': f'https://www.example.com/recipe/{index}/',
+        # About 10% unrated, as in the real dump
+        'rating': float('nan') if rng.random() < 0.1 else round(min(5.0, rng.gauss(4.3, 0.5)), 1),
+        'total_time': total_time or None,
+        'prep_time': prep_time,
+        'cook_time': cook_time,
+        'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(15, 60))).capitalize() + '.',
+        'ingredients': ingredients,
+        'instructions': instructions,
+        'nutrients': nutrients,
+        'serves': f'{rng.choice([2, 4, 6, 8, 12])} servings',
+    }
+
+
+def write_catalog(path, size, seed=0):
+    """
+    Write `size` synthetic recipes to `path` as one JSON object keyed by index.
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for index in range(size):
+            if index:
+                f.write(', ')
+            f.write(f'"{index}": ')
+            # allow_nan keeps the NaN ratings of the real dump
+            f.write(json.dumps(synthetic_recipe(rng, index), allow_nan=True))
+        f.write('}\n')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=parse_size, default=parse_size('10k'), help='Recipes, e.g. 10k, 100k, 1M')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('-o', '--output', required=True, help='File to write')
+    args = parser.parse_args()
+
+    write_catalog(args.output, args.size, args.seed)
+    sys.stderr.write(f'Wrote {args.size} recipes to {args.output}\n')
+
+
+if __name__ == '__main__':
+    main()
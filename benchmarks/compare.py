@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmarks.suite result files and flag regressions.
+
+Measurements are matched on (size, group, case); for all of them lower is
+better. Prints one JSON line per measurement and exits with status 1 when
+any got slower by more than --threshold percent:
+
+    python -m benchmarks.compare baseline.jsonl results.jsonl --threshold 15
+"""
+import argparse
+import json
+import sys
+
+
+# Not performance measurements of the code under test
+IGNORED_GROUPS = ('environment', 'catalog')
+
+
+def load_results(path):
+    """
+    Last value per (size, group, case) in a JSON lines file.
+    """
+    results = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            result = json.loads(line)
+            if result.get('benchmark') != 'suite' or result.get('group') in IGNORED_GROUPS:
+                continue
+            results[(result['size'], result['group'], result['case'])] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline', help='Results of the reference run')
+    parser.add_argument('current', help='Results of the run to check')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Slowdown in percent counted as a regression (default: 10)')
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys(), key=lambda key: (key[0] or 0, key[1], key[2])):
+        before, after = baseline[key]['value'], current[key]['value']
+        change = (after - before) / before * 100 if before else 0.0
+        status = 'ok'
+        if change > args.threshold:
+            status = 'regression'
+            regressions += 1
+        elif change < -args.threshold:
+            status = 'improvement'
+        size, group, case = key
+        print(json.dumps({
+            'size': size,
+            'group': group,
+            'case': case,
+            'unit': current[key]['unit'],
+            'baseline': before,
+            'current': after,
+            'change_pct': round(change, 1),
+            'status': status,
+        }))
+
+    for name, missing in (('baseline', current.keys() - baseline.keys()), ('current', baseline.keys() - current.keys())):
+        for size, group, case in sorted(missing, key=lambda key: (key[0] or 0, key[1], key[2])):
+            sys.stderr.write(f'Not in {name}: size={size} {group}/{case}\n')
+
+    if regressions:
+        sys.stderr.write(f'{regressions} regression(s) above {args.threshold}%\n')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
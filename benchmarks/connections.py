@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Request latency with and without persistent database connections.
+
+Sends requests through Django's test client against the configured
+database. The test client skips the connection housekeeping done by the
+request_started/request_finished signals, so it is run here explicitly:
+
+    python -m benchmarks.connections --requests 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import close_old_connections, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from recipes.models import Recipe  # noqa: E402
+
+
+CONFIGS = [
+    {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False},
+    {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(client, path, requests):
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        close_old_connections()
+        response = client.get(path)
+        close_old_connections()
+        samples.append((time.perf_counter() - started) * 1e3)
+        if response.status_code != 200:
+            raise SystemExit(f'{path}: HTTP {response.status_code}')
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per configuration (default: 200)')
+    args = parser.parse_args()
+
+    pk = Recipe.objects.values_list('pk', flat=True).first()
+    if pk is None:
+        raise SystemExit('No recipes loaded')
+    # The detail endpoint is not response-cached, so every request hits the database
+    path = f'/api/recipes/{pk}'
+    client = Client()
+    connection = connections['default']
+
+    for config in CONFIGS:
+        connection.close()
+        connection.settings_dict.update(config)
+        measure(client, path, 10)  # warm-up
+        samples = measure(client, path, args.requests)
+        print(json.dumps({
+            'benchmark': 'connections',
+            'conn_max_age': config['CONN_MAX_AGE'],
+            'conn_health_checks': config['CONN_HEALTH_CHECKS'],
+            'requests': args.requests,
+            'p50_ms': round(statistics.median(samples), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+        }))
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
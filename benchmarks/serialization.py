@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Per-row serialization cost: DRF RecipeSerializer vs FastRecipeSerializer.
+
+Runs entirely in memory (no database needed):
+
+    python -m benchmarks.serialization --rows 100 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from recipes.models import Recipe  # noqa: E402
+from recipes.serializers import (  # noqa: E402
+    FastRecipeSerializer,
+    RecipeSerializer,
+    RecipeSummarySerializer,
+)
+
+
+def make_rows(count):
+    now = timezone.now()
+    rows = []
+    for i in range(count):
+        rows.append({
+            'id': i + 1,
+            'title': f'Recipe {i}',
+            'cuisine': 'Southern Recipes',
+            'rating': 4.5,
+            'prep_time': 15,
+            'cook_time': 45,
+            'total_time': 60,
+            'description': 'A tasty dish. ' * 20,
+            'nutrients': {'calories': '389 kcal', 'proteinContent': '5 g', 'fatContent': '21 g'},
+            'serves': '8 servings',
+            'continent': 'North America',
+            'country_state': 'US',
+            'url': f'https://example.com/recipe/{i}/',
+            'ingredients': [f'{n} cups of something' for n in range(12)],
+            'instructions': [f'Step {n}: do the thing.' for n in range(8)],
+            'created_at': now,
+            'updated_at': now,
+        })
+    return rows
+
+
+def per_row_us(func, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - started)
+    return best / len(rows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100, help='Rows per page (default: 100)')
+    parser.add_argument('--repeat', type=int, default=50, help='Timing repetitions, best is kept (default: 50)')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    instances = [Recipe(**row) for row in rows]
+
+    results = []
+    for serializer_class in (RecipeSummarySerializer, RecipeSerializer):
+        fast = FastRecipeSerializer.compile(serializer_class)
+        drf_data = serializer_class(instances, many=True).data
+        fast_data = fast.serialize(rows)
+        if json.dumps(drf_data) != json.dumps(fast_data):
+            raise SystemExit(f'{serializer_class.__name__}: fast output differs from DRF output')
+
+        drf_us = per_row_us(lambda page: serializer_class(page, many=True).data, instances, args.repeat)
+        fast_us = per_row_us(fast.serialize, rows, args.repeat)
+        results.append({
+            'benchmark': 'serialization',
+            'serializer': serializer_class.__name__,
+            'rows': args.rows,
+            'drf_us_per_row': round(drf_us, 2),
+            'fast_us_per_row': round(fast_us, 2),
+            'speedup': round(drf_us / fast_us, 1),
+        })
+
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
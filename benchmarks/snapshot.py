@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Search latency: SQL vs the in-memory catalog snapshot (recipes.snapshot).
+
+Resolves one search page (rows plus capped total) for a few filter sets
+both ways against the configured database. Requires NumPy and loaded data:
+
+    python -m benchmarks.snapshot --repeat 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import QueryDict  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from recipes.filters import RecipeFilter  # noqa: E402
+from recipes.models import Recipe  # noqa: E402
+from recipes.pagination import RecipeSearchPagination  # noqa: E402
+from recipes.serializers import RecipeSummarySerializer  # noqa: E402
+from recipes.snapshot import get_snapshot, is_enabled, snapshot_search  # noqa: E402
+
+
+QUERIES = [
+    'rating=>=4.5',
+    'calories=<=400&rating=>=4',
+    'total_time=>=30&total_time=<=60&cuisine=ital',
+    'cuisine_in=Italian,Mexican&protein=>=20&fat=<15',
+]
+
+COLUMNS = RecipeSummarySerializer.Meta.fields
+LIMIT = 10
+
+
+def resolve_page(queryset):
+    rows = list(queryset[:LIMIT + 1])
+    total = queryset[:RecipeSearchPagination.max_results].count()
+    return rows[:LIMIT], total
+
+
+def sql_page(params):
+    queryset = RecipeFilter(params, queryset=Recipe.objects.order_by('-rating', 'title')).qs
+    return resolve_page(queryset.values(*COLUMNS))
+
+
+def snapshot_page(params):
+    return resolve_page(snapshot_search(params, Recipe.objects.values(*COLUMNS)))
+
+
+def best_ms(func, params, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(params)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='Timing repetitions, best is kept (default: 20)')
+    parser.add_argument('--query', action='append', help='Search query string to time (repeatable)')
+    args = parser.parse_args()
+
+    with override_settings(RECIPES_SNAPSHOT=True):
+        if not is_enabled():
+            raise SystemExit('NumPy is not installed')
+
+        started = time.perf_counter()
+        snapshot = get_snapshot()
+        build_ms = (time.perf_counter() - started) * 1e3
+        print(json.dumps({
+            'benchmark': 'snapshot_build',
+            'recipes': len(snapshot),
+            'bytes': snapshot.nbytes,
+            'build_ms': round(build_ms, 1),
+        }))
+
+        for query in args.query or QUERIES:
+            params = QueryDict(query)
+            sql_rows, sql_total = sql_page(params)
+            snap_rows, snap_total = snapshot_page(params)
+            if sql_total != snap_total:
+                raise SystemExit(f'{query}: snapshot total {snap_total} != SQL total {sql_total}')
+
+            sql_ms = best_ms(sql_page, params, args.repeat)
+            snap_ms = best_ms(snapshot_page, params, args.repeat)
+            print(json.dumps({
+                'benchmark': 'snapshot_search',
+                'query': query,
+                'total': sql_total,
+                'sql_ms': round(sql_ms, 3),
+                'snapshot_ms': round(snap_ms, 3),
+                'speedup': round(sql_ms / snap_ms, 1),
+            }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Repeatable benchmark suite for the loader and the API.
+
+For each catalog size it generates a synthetic catalog (benchmarks.catalog),
+times `load_recipes` into a throwaway database, then times list pages at
+shallow and deep offsets, keyset pages, the detail view, every search
+filter and serialization. Requests go through the full middleware stack
+with the response cache disabled, so each one does its real work.
+
+The database is Django's test database for the configured connection
+(`test_<NAME>` on the same local PostgreSQL server), created and migrated
+for the run and dropped afterwards; the configured database is never
+touched. Results are JSON lines, one per measurement, on stdout and in
+--output; compare two runs with benchmarks.compare:
+
+    python -m benchmarks.suite --size 10k --size 100k --output results.jsonl
+    python -m benchmarks.compare baseline.jsonl results.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.core.management.color import no_style  # noqa: E402
+from django.db import close_old_connections, connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from recipes.models import Ingredient, Recipe, RecipeIngredient, rating_sort_key  # noqa: E402
+from recipes.pagination import RecipeCursorPagination  # noqa: E402
+from recipes.serializers import FastRecipeSerializer, RecipeSerializer, RecipeSummarySerializer  # noqa: E402
+from recipes.snapshot import is_enabled as snapshot_enabled  # noqa: E402
+
+from benchmarks.catalog import parse_size, write_catalog  # noqa: E402
+from benchmarks.serialization import per_row_us  # noqa: E402
+
+
+PAGE_SIZE = 20
+
+# One search per filter, plus a few typical combinations
+SEARCHES = [
+    ('calories', 'calories=<=400'),
+    ('protein', 'protein=>=20'),
+    ('carbohydrates', 'carbohydrates=<30'),
+    ('fat', 'fat=<=15'),
+    ('rating', 'rating=>=4.5'),
+    ('total_time', 'total_time=<=30'),
+    ('prep_time', 'prep_time=<=10'),
+    ('cook_time', 'cook_time=>=60'),
+    ('title', 'title=chicken'),
+    ('cuisine', 'cuisine=ital'),
+    ('cuisine_in', 'cuisine_in=Italian,Mexican,Thai'),
+    ('continent_in', 'continent_in=Asia,Africa'),
+    ('q', 'q=creamy+soup'),
+    ('ingredient', 'ingredient=chicken,rice'),
+    ('ingredient_any', 'ingredient=salmon,shrimp,cod&ingredient_match=any'),
+    ('exclude_ingredient', 'exclude_ingredient=butter,eggs'),
+    ('sort', 'sort=calories'),
+    ('combined', 'calories=<=500&protein=>=15&rating=>=4&cuisine_in=Italian,Greek'),
+    ('range', 'total_time=>=30&total_time=<=60&fat=<20'),
+    ('no_total', 'rating=>=4&total=false'),
+]
+
+# Response cache off: every request is a miss
+UNCACHED = {
+    'CACHES': dict(settings.CACHES, recipes={'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}),
+}
+
+
+class Suite:
+    def __init__(self, args, output):
+        self.args = args
+        self.output = output
+        self.client = Client(HTTP_ACCEPT='application/json')
+
+    def emit(self, size, group, case, value, unit, **extra):
+        result = {
+            'benchmark': 'suite',
+            'size': size,
+            'group': group,
+            'case': case,
+            'value': value,
+            'unit': unit,
+        }
+        result.update(extra)
+        line = json.dumps(result)
+        print(line, flush=True)
+        if self.output:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def emit_environment(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT version()')
+            database = cursor.fetchone()[0]
+        self.emit(None, 'environment', 'environment', None, None, **{
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': database,
+            'settings': settings.SETTINGS_MODULE,
+            'snapshot': snapshot_enabled(),
+            'count_strategy': getattr(settings, 'RECIPES_COUNT_STRATEGY', 'exact'),
+            'repeat': self.args.repeat,
+            'seed': self.args.seed,
+        })
+
+    def catalog_path(self, size):
+        path = Path(self.args.data_dir) / f'catalog_{size}_{self.args.seed}.json'
+        if not path.exists():
+            started = time.perf_counter()
+            write_catalog(path, size, self.args.seed)
+            self.emit(size, 'catalog', 'generate', round(time.perf_counter() - started, 3), 's',
+                      bytes=path.stat().st_size)
+        return path
+
+    def reset(self):
+        # Catalog tables only: CatalogState keeps counting up, so nothing keyed on
+        # the catalog version survives into the next load
+        tables = [model._meta.db_table for model in (RecipeIngredient, Ingredient, Recipe)]
+        sql = connection.ops.sql_flush(no_style(), tables, reset_sequences=True)
+        connection.ops.execute_sql_flush(sql)
+
+    def time_load(self, size, path):
+        modes = [('insert', {})]
+        if connection.vendor == 'postgresql':
+            modes.append(('copy', {'copy': True}))
+        for name, options in modes:
+            if self.args.load and name not in self.args.load:
+                continue
+            self.reset()
+            stdout = StringIO()
+            started = time.perf_counter()
+            call_command('load_recipes', str(path), batch_size=self.args.batch_size, stdout=stdout, **options)
+            elapsed = time.perf_counter() - started
+            loaded = Recipe.objects.count()
+            if loaded != size:
+                raise SystemExit(f'load_recipes ({name}) loaded {loaded} of {size} recipes:\n{stdout.getvalue()}')
+            self.emit(size, 'load', name, round(elapsed, 3), 's', recipes_per_sec=round(size / elapsed, 1))
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Recipe._meta.db_table}')
+
+    def time_path(self, path):
+        for _ in range(self.args.warmup):
+            self.request(path)
+        timings = []
+        for _ in range(self.args.repeat):
+            started = time.perf_counter()
+            self.request(path)
+            timings.append((time.perf_counter() - started) * 1e3)
+        timings.sort()
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'min_ms': round(timings[0], 3),
+        }
+
+    def request(self, path):
+        close_old_connections()
+        response = self.client.get(path)
+        close_old_connections()
+        if response.status_code != 200:
+            raise SystemExit(f'{path}: HTTP {response.status_code} {response.content[:200]!r}')
+        return response
+
+    def emit_request(self, size, group, case, path):
+        timings = self.time_path(path)
+        self.emit(size, group, case, timings['p50_ms'], 'ms', path=path, **timings)
+
+    def cursor_at(self, offset):
+        row = (
+            Recipe.objects.annotate(rating_key=rating_sort_key())
+            .order_by('-rating_key', 'title', 'id')
+            .values('rating_key', 'title', 'id')[offset]
+        )
+        return RecipeCursorPagination().encode_cursor(row)
+
+    def time_list(self, size):
+        last_page = max(1, size // PAGE_SIZE)
+        pages = [('page_first', 1), ('page_middle', max(1, last_page // 2)), ('page_last', last_page)]
+        for case, page in pages:
+            self.emit_request(size, 'list', case, f'/api/recipes?page={page}&limit={PAGE_SIZE}')
+
+        self.emit_request(size, 'list', 'cursor_first', f'/api/recipes?cursor=&limit={PAGE_SIZE}')
+        deep = self.cursor_at(max(0, size - PAGE_SIZE - 1))
+        self.emit_request(size, 'list', 'cursor_last', f'/api/recipes?cursor={deep}&limit={PAGE_SIZE}')
+
+        pk = Recipe.objects.order_by('pk').values_list('pk', flat=True)[size // 2]
+        self.emit_request(size, 'detail', 'detail', f'/api/recipes/{pk}')
+
+    def time_search(self, size):
+        for case, query in SEARCHES:
+            self.emit_request(size, 'search', case, f'/api/recipes/search?{query}&limit={PAGE_SIZE}')
+        # Deepest page a search can reach
+        self.emit_request(size, 'search', 'page_deep', f'/api/recipes/search?rating=>=0&page=50&limit={PAGE_SIZE}')
+
+    def time_serialization(self, size):
+        for serializer_class in (RecipeSummarySerializer, RecipeSerializer):
+            fields = serializer_class.Meta.fields
+            queryset = Recipe.objects.order_by('-rating', 'title')[:self.args.serialize_rows]
+            instances = list(queryset)
+            rows = list(queryset.values(*fields))
+            fast = FastRecipeSerializer.compile(serializer_class)
+
+            drf_us = per_row_us(lambda page: serializer_class(page, many=True).data, instances, self.args.repeat)
+            fast_us = per_row_us(fast.serialize, rows, self.args.repeat)
+            self.emit(size, 'serialization', f'{serializer_class.__name__}.drf', round(drf_us, 2), 'us/row')
+            self.emit(size, 'serialization', f'{serializer_class.__name__}.fast', round(fast_us, 2), 'us/row')
+
+    def run(self):
+        self.emit_environment()
+        with override_settings(**UNCACHED):
+            for size in self.args.size:
+                path = self.catalog_path(size)
+                self.time_load(size, path)
+                self.time_list(size)
+                self.time_search(size)
+                self.time_serialization(size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=parse_size, action='append',
+                        help='Catalog size, e.g. 10k, 100k, 1M (repeatable; default: 10k)')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed repetitions per case (default: 20)')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per case (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Catalog random seed (default: 0)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='load_recipes --batch-size (default: 1000)')
+    parser.add_argument('--load', action='append', choices=['insert', 'copy'],
+                        help='Loader modes to time (repeatable; default: all). The last one is kept for queries.')
+    parser.add_argument('--serialize-rows', type=int, default=100, help='Rows per serialized page (default: 100)')
+    parser.add_argument('--data-dir', default=tempfile.gettempdir(),
+                        help='Where generated catalogs are kept and reused (default: system temp dir)')
+    parser.add_argument('--output', help='Also append results to this JSON lines file')
+    parser.add_argument('--keepdb', action='store_true',
+                        help='Keep the test database between runs (skips re-creating and migrating it)')
+    args = parser.parse_args()
+    args.size = args.size or [parse_size('10k')]
+
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=args.keepdb, serialize=False)
+    output = open(args.output, 'a', encoding='utf-8') if args.output else None
+    try:
+        Suite(args, output).run()
+    finally:
+        if output:
+            output.close()
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+
+
+if __name__ == '__main__':
+    main()
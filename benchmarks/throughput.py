@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Single-process request throughput for a few API endpoints.
+
+Runs requests through Django's full middleware stack and renderers via the
+test client, so it measures the framework overhead a settings profile adds
+on top of the views. Compare profiles by running it once per settings
+module against the same database:
+
+    DJANGO_SETTINGS_MODULE=recipe_project.settings python -m benchmarks.throughput
+    DJANGO_SETTINGS_MODULE=recipe_project.settings_production python -m benchmarks.throughput
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import close_old_connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from recipes.models import Recipe  # noqa: E402
+
+
+def default_paths():
+    pk = Recipe.objects.values_list('pk', flat=True).first()
+    if pk is None:
+        raise SystemExit('No recipes loaded')
+    return [
+        # Served from the response cache after the first request
+        '/api/recipes?limit=10',
+        '/api/recipes/search?rating=>=4&limit=10',
+        # Not cached: one query plus serialization per request
+        f'/api/recipes/{pk}',
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=3.0, help='Time spent on each path (default: 3)')
+    parser.add_argument('--path', action='append', help='Path to request (repeatable)')
+    args = parser.parse_args()
+
+    client = Client(HTTP_ACCEPT='application/json')
+    for path in args.path or default_paths():
+        for _ in range(20):  # warm-up, fills the response cache
+            client.get(path)
+
+        requests = 0
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        while time.perf_counter() < deadline:
+            close_old_connections()
+            response = client.get(path)
+            close_old_connections()
+            if response.status_code != 200:
+                raise SystemExit(f'{path}: HTTP {response.status_code}')
+            requests += 1
+        elapsed = time.perf_counter() - started
+
+        print(json.dumps({
+            'benchmark': 'throughput',
+            'settings': settings.SETTINGS_MODULE,
+            'debug': settings.DEBUG,
+            'path': path,
+            'requests_per_sec': round(requests / elapsed, 1),
+            'ms_per_request': round(elapsed / requests * 1e3, 3),
+        }))
+
+
+if __name__ == '__main__':
+    main()
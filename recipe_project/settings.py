@@ -4,6 +4,8 @@ Django settings for recipe_project project.
 
 from pathlib import Path
 import os
+import django
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -33,12 +35,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'recipes',
 ]
 
 MIDDLEWARE = [
+    'recipes.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +76,12 @@ WSGI_APPLICATION = 'recipe_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request, None keeps them forever) and checked before reuse. Under ASGI
+# use 0 and pool connections instead.
+
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -80,9 +90,52 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+# Connection pooling: '' (none), 'pgbouncer' (PgBouncer or another external
+# pooler in transaction mode) or 'native' (Django 5.1+ with psycopg 3)
+DB_POOL = os.getenv('DB_POOL', '')
+
+if DB_POOL == 'pgbouncer':
+    # Server-side cursors do not survive transaction pooling; iterator()
+    # then fetches in chunks from client-side cursors instead.
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DB_POOL == 'native':
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured('DB_POOL=native needs Django 5.1+ with psycopg 3')
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        },
+    }
+elif DB_POOL:
+    raise ImproperlyConfigured(f'Unknown DB_POOL {DB_POOL!r}')
+
+# Read replicas: comma-separated host[:port] list. Recipe reads (list, search,
+# facets, export) are spread over them by recipes.routers.ReadReplicaRouter;
+# writes, migrations and everything else use the primary.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+
+for index, replica in enumerate(DB_REPLICA_HOSTS, start=1):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'],
+        HOST=host,
+        PORT=port or DATABASES['default']['PORT'],
+        TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['recipes.routers.ReadReplicaRouter'] if DB_REPLICA_HOSTS else []
+
+# Seconds after a catalog change during which recipe reads stay on the
+# primary; set it above the replicas' worst replication lag
+RECIPES_REPLICA_LAG = float(os.getenv('RECIPES_REPLICA_LAG', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -125,6 +178,53 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The 'recipes' cache holds API responses and the catalog version. Point
+# RECIPES_CACHE_BACKEND/RECIPES_CACHE_LOCATION at Redis or Memcached to share
+# it between processes.
+
+RECIPES_CACHE_BACKEND = os.getenv('RECIPES_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipes': {
+        'BACKEND': RECIPES_CACHE_BACKEND,
+        'LOCATION': os.getenv('RECIPES_CACHE_LOCATION', 'recipes'),
+        'TIMEOUT': int(os.getenv('RECIPES_CACHE_TTL', '300')),
+    },
+}
+
+if RECIPES_CACHE_BACKEND.endswith('LocMemCache'):
+    # Least-recently-used entries are culled beyond this size
+    CACHES['recipes']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('RECIPES_CACHE_MAX_ENTRIES', '1000')),
+    }
+
+# Seconds a process may keep using a cached catalog version before re-reading it
+RECIPES_CATALOG_VERSION_TTL = float(os.getenv('RECIPES_CATALOG_VERSION_TTL', '2'))
+
+# How /api/recipes computes `total`: exact (COUNT(*) every request), cached
+# (COUNT(*) memoized per catalog version) or estimated (pg_class.reltuples)
+RECIPES_COUNT_STRATEGY = os.getenv('RECIPES_COUNT_STRATEGY', 'cached')
+
+# Answer /api/recipes/search from an in-process NumPy snapshot of the
+# filterable columns (requires numpy; see recipes/snapshot.py)
+RECIPES_SNAPSHOT = os.getenv('RECIPES_SNAPSHOT', 'False') == 'True'
+
+# Where `manage.py build_similarity` writes the index served by
+# /api/recipes/<id>/similar (requires numpy; see recipes/similarity.py)
+RECIPES_SIMILARITY_DIR = Path(os.getenv('RECIPES_SIMILARITY_DIR', BASE_DIR / 'similarity_index'))
+
+# Per-endpoint metrics, Server-Timing headers and /metrics (recipes/metrics.py).
+# Requests and single SQL queries slower than these thresholds are logged to
+# the `recipes.slow` logger with their query string; -1 disables either log.
+RECIPES_METRICS = os.getenv('RECIPES_METRICS', 'True') == 'True'
+RECIPES_SLOW_REQUEST_MS = float(os.getenv('RECIPES_SLOW_REQUEST_MS', '500'))
+RECIPES_SLOW_QUERY_MS = float(os.getenv('RECIPES_SLOW_QUERY_MS', '100'))
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -0,0 +1,35 @@
+"""
+Production settings for recipe_project.
+
+Use with DJANGO_SETTINGS_MODULE=recipe_project.settings_production. Same as
+settings.py apart from:
+- DEBUG is always off, so executed queries are not kept in memory
+- session, CSRF, auth and messages middleware are skipped for /api/
+  requests (see recipes.middleware); the admin keeps them
+- the API renders JSON only, through orjson when installed, and does no
+  authentication
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+DEBUG = False
+
+API_PATH_PREFIX = '/api/'
+
+MIDDLEWARE = [
+    'recipes.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'recipes.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'recipes.middleware.CsrfViewMiddleware',
+    'recipes.middleware.AuthenticationMiddleware',
+    'recipes.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=['recipes.renderers.ORJSONRenderer'],
+    DEFAULT_AUTHENTICATION_CLASSES=[],
+    DEFAULT_PERMISSION_CLASSES=['rest_framework.permissions.AllowAny'],
+)
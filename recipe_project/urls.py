@@ -3,8 +3,10 @@ URL configuration for recipe_project project.
 """
 from django.contrib import admin
 from django.urls import path, include
+from recipes.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('recipes.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,202 @@
+"""
+Async variants of the list and search endpoints.
+
+These are plain Django async views, so under ASGI a slow client holds a
+coroutine rather than a worker thread. Rows are read with the async ORM
+(aiterator/acount) and streamed to the client in chunks, as JSON by default
+or as NDJSON with ?format=ndjson, so a page is never buffered as a whole.
+Query parameters and the JSON envelope match the sync endpoints.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.views import View
+from django_filters.utils import translate_validation
+from rest_framework.exceptions import APIException, NotFound
+
+from .export import encode_json
+from .filters import RecipeFilter
+from .models import Recipe
+from .pagination import RecipeSearchPagination, count_queryset
+from .serializers import (
+    FastRecipeSerializer,
+    RecipeSerializer,
+    RecipeSummarySerializer,
+    fetch_columns,
+    parse_selected_fields,
+)
+from .views import error_response
+
+
+class RecipeStreamView(View):
+    """
+    Base class for streamed recipe endpoints.
+
+    Subclasses provide get_metadata(), which returns the envelope keys
+    written before `data`. Rows past `limit` are fetched once to work out
+    `has_next`, which is therefore written after `data`.
+    """
+    http_method_names = ['get', 'head', 'options']
+    queryset = Recipe.objects.all().order_by('-rating', 'title')
+    serializer_class = RecipeSummarySerializer
+    filterset_class = None
+    always_fetch = ('id', 'title', 'rating')
+    page_size = 10
+    max_page_size = 1000
+    # Rows fetched per database round trip and written per response chunk
+    chunk_size = 200
+    invalid_page_message = 'Invalid page.'
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            fields = parse_selected_fields(request.GET)
+            self.page_number, self.limit = self.get_page(request)
+            queryset = self.filter_queryset(request, fields)
+            metadata = await self.get_metadata(request, queryset)
+        except APIException as exc:
+            return error_response(exc)
+
+        serializer_class = RecipeSerializer if fields is not None else self.serializer_class
+        serializer = FastRecipeSerializer.compile(serializer_class, fields)
+        start, stop = self.get_bounds()
+        rows = queryset[start:stop + 1].aiterator(chunk_size=self.chunk_size) if stop > start else None
+
+        if request.GET.get('format') == 'ndjson':
+            return StreamingHttpResponse(
+                self.stream_ndjson(serializer, rows, stop - start),
+                content_type='application/x-ndjson',
+            )
+        return StreamingHttpResponse(
+            self.stream_json(serializer, rows, stop - start, metadata),
+            content_type='application/json',
+        )
+
+    def get_page(self, request):
+        try:
+            page = int(request.GET.get('page', 1))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message)
+        if page < 1:
+            raise NotFound(self.invalid_page_message)
+        try:
+            limit = int(request.GET['limit'])
+        except (KeyError, ValueError):
+            limit = self.page_size
+        if limit < 1:
+            limit = self.page_size
+        return page, min(limit, self.max_page_size)
+
+    def get_bounds(self):
+        start = (self.page_number - 1) * self.limit
+        return start, start + self.limit
+
+    def filter_queryset(self, request, fields):
+        queryset = self.queryset.all()
+        if self.filterset_class is not None:
+            filterset = self.filterset_class(request.GET, queryset=queryset, request=request)
+            if not filterset.is_valid():
+                raise translate_validation(filterset.errors)
+            queryset = filterset.qs
+        serializer_class = RecipeSerializer if fields is not None else self.serializer_class
+        return queryset.values(*fetch_columns(serializer_class, fields, self.always_fetch))
+
+    async def get_metadata(self, request, queryset):
+        return {'page': self.page_number, 'limit': self.limit}
+
+    async def iter_page(self, serializer, rows, size):
+        """
+        Yield serialized rows of the page, then True/False for has_next.
+        """
+        columns = serializer.get_columns()
+        count = 0
+        if rows is not None:
+            async for row in rows:
+                if count == size:
+                    yield True
+                    return
+                count += 1
+                yield serializer.to_representation(row, columns)
+        yield False
+
+    async def stream_json(self, serializer, rows, size, metadata):
+        head = encode_json(dict(metadata, data=[]))
+        chunk = [head[:-3], '[']
+        first = True
+        async for item in self.iter_page(serializer, rows, size):
+            if isinstance(item, bool):
+                chunk.append(f'],"has_next":{encode_json(item)}}}')
+                break
+            if not first:
+                chunk.append(',')
+            first = False
+            chunk.append(encode_json(item))
+            if len(chunk) >= 2 * self.chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+        yield ''.join(chunk)
+
+    async def stream_ndjson(self, serializer, rows, size):
+        chunk = []
+        async for item in self.iter_page(serializer, rows, size):
+            if isinstance(item, bool):
+                break
+            chunk.append(encode_json(item) + '\n')
+            if len(chunk) >= self.chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+
+class RecipeListStreamView(RecipeStreamView):
+    """
+    GET /api/recipes/stream
+    Async, streamed version of /api/recipes.
+    Query params: page, limit (up to max_page_size), fields, exclude, format
+    """
+    async def get_metadata(self, request, queryset):
+        strategy = getattr(settings, 'RECIPES_COUNT_STRATEGY', 'exact')
+        if strategy == 'exact':
+            total = await queryset.acount()
+        else:
+            total, strategy = await sync_to_async(count_queryset)(queryset, strategy)
+
+        start, _ = self.get_bounds()
+        if self.page_number > 1 and start >= total and strategy != 'estimated':
+            raise NotFound(self.invalid_page_message)
+        return {
+            'page': self.page_number,
+            'limit': self.limit,
+            'total': total,
+            'total_strategy': strategy,
+        }
+
+
+class RecipeSearchStreamView(RecipeStreamView):
+    """
+    GET /api/recipes/search/stream
+    Async, streamed version of /api/recipes/search; accepts the same filters.
+    As there, only the first max_results matches are reachable and
+    total=false skips the count.
+    """
+    filterset_class = RecipeFilter
+    max_results = RecipeSearchPagination.max_results
+
+    def get_bounds(self):
+        start, stop = super().get_bounds()
+        return min(start, self.max_results), min(stop, self.max_results)
+
+    async def get_metadata(self, request, queryset):
+        metadata = await super().get_metadata(request, queryset)
+        include_total = request.GET.get(RecipeSearchPagination.total_query_param, 'true')
+        if include_total.strip().lower() not in ('0', 'false', 'no', 'off'):
+            metadata['total'] = await queryset[:self.max_results].acount()
+        return metadata
+
+    async def iter_page(self, serializer, rows, size):
+        _, stop = self.get_bounds()
+        async for item in super().iter_page(serializer, rows, size):
+            if isinstance(item, bool):
+                # Nothing past max_results is reachable
+                item = item and stop < self.max_results
+            yield item
@@ -0,0 +1,150 @@
+"""
+Batched search: several /api/recipes/search queries in one request.
+
+Each spec is an object of search parameters plus optional page and limit.
+All pages are resolved in a single database round trip: from the catalog
+snapshot when it can answer every spec (one id lookup), otherwise as one
+UNION ALL of the per-spec page queries. Databases that cannot order and
+limit the parts of a compound query run the specs one by one.
+"""
+from django.db import connections
+from django.db.models import Value, Window
+from django.db.models.functions import RowNumber
+from django.http import QueryDict
+from django_filters.utils import translate_validation
+from rest_framework.exceptions import ValidationError
+
+from .filters import RecipeFilter
+from .pagination import RecipeSearchPagination
+from .snapshot import snapshot_search
+
+
+MAX_QUERIES = 50
+
+
+class SearchSpec:
+    """
+    One search of a batch: validated filter parameters and page bounds.
+    """
+    page_size = RecipeSearchPagination.page_size
+    max_page_size = RecipeSearchPagination.max_page_size
+    max_results = RecipeSearchPagination.max_results
+
+    def __init__(self, filterset, page=1, limit=None):
+        self.filterset = filterset
+        self.page = page
+        self.limit = min(limit or self.page_size, self.max_page_size)
+        self.start = min((page - 1) * self.limit, self.max_results)
+        self.stop = min(self.start + self.limit, self.max_results)
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Build a spec from a JSON object, raising ValidationError on bad input.
+        Values may be scalars or lists (for repeated parameters).
+        """
+        if not isinstance(spec, dict):
+            raise ValidationError('Each query must be an object of search parameters.')
+        spec = dict(spec)
+        try:
+            page = int(spec.pop('page', 1))
+            limit = int(spec.pop('limit', 0)) or None
+        except (TypeError, ValueError):
+            raise ValidationError('page and limit must be integers.')
+        if page < 1 or (limit is not None and limit < 1):
+            raise ValidationError('page and limit must be positive.')
+
+        params = QueryDict(mutable=True)
+        for name, value in spec.items():
+            for item in value if isinstance(value, list) else [value]:
+                params.appendlist(name, str(item))
+        filterset = RecipeFilter(params)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return cls(filterset, page, limit)
+
+    def page_rows(self, rows):
+        """
+        Split the rows fetched for this spec (up to limit + 1) into the page
+        and has_next.
+        """
+        size = self.stop - self.start
+        return rows[:size], len(rows) > size and self.stop < self.max_results
+
+
+def parse_specs(data):
+    """
+    Validate a batch request body: {"queries": [spec, ...]} or a bare list.
+    """
+    specs = data.get('queries') if isinstance(data, dict) else data
+    if not isinstance(specs, list) or not specs:
+        raise ValidationError({'queries': 'Expected a non-empty list of search objects.'})
+    if len(specs) > MAX_QUERIES:
+        raise ValidationError({'queries': f'At most {MAX_QUERIES} queries per batch.'})
+
+    parsed, errors = [], {}
+    for index, spec in enumerate(specs):
+        try:
+            parsed.append(SearchSpec.parse(spec))
+        except ValidationError as exc:
+            errors[str(index)] = exc.detail
+    if errors:
+        raise ValidationError({'queries': errors})
+    return parsed
+
+
+def _run_snapshot(specs, queryset):
+    results = [snapshot_search(spec.filterset.data, None, spec.filterset) for spec in specs]
+    if any(result is None for result in results):
+        return None
+    page_ids = [result.ids[spec.start:spec.stop + 1].tolist() for spec, result in zip(specs, results)]
+    wanted = {pk for ids in page_ids for pk in ids}
+    rows = {row['id']: row for row in queryset.filter(pk__in=wanted)} if wanted else {}
+    return [[rows[pk] for pk in ids if pk in rows] for ids in page_ids]
+
+
+def _run_union(specs, queryset, columns):
+    parts = []
+    for index, spec in enumerate(specs):
+        if spec.stop <= spec.start:
+            continue
+        part = spec.filterset.filter_queryset(queryset.all())
+        # Without an explicit order the model's Meta.ordering applies, which
+        # the window would not see; ties are broken by id as in SNAPSHOT_ORDERING
+        ordering = list(part.query.order_by or part.query.get_meta().ordering)
+        if not any(field in ('id', '-id', 'pk', '-pk') for field in ordering):
+            ordering.append('id')
+        part = part.order_by(*ordering).annotate(
+            batch_index=Value(index),
+            # Rows of a UNION ALL come back in no particular order
+            batch_position=Window(RowNumber(), order_by=ordering),
+        ).values(*columns, 'batch_index', 'batch_position')
+        parts.append(part[spec.start:spec.stop + 1])
+
+    pages = [[] for _ in specs]
+    if not parts:
+        return pages
+    rows = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    for row in sorted(rows, key=lambda row: (row['batch_index'], row['batch_position'])):
+        pages[row.pop('batch_index')].append(row)
+        row.pop('batch_position')
+    return pages
+
+
+def run_batch(specs, queryset, columns):
+    """
+    Resolve every spec against `queryset` (ordered, unfiltered), fetching
+    `columns` as .values() rows. Returns one (rows, has_next) pair per spec.
+    """
+    columns = sorted(columns)
+    fetch = queryset.values(*columns)
+    pages = _run_snapshot(specs, fetch)
+    if pages is None:
+        if connections[queryset.db].features.supports_slicing_ordering_in_compound:
+            pages = _run_union(specs, queryset, columns)
+        else:
+            pages = [
+                list(spec.filterset.filter_queryset(fetch.all())[spec.start:spec.stop + 1])
+                for spec in specs
+            ]
+    return [spec.page_rows(rows) for spec, rows in zip(specs, pages)]
@@ -0,0 +1,158 @@
+"""
+Catalog versioning and response caching for the read endpoints.
+
+Every change to the recipe catalog bumps a version counter stored in the
+database. Cached responses and ETags are keyed on that version, so stale
+entries are simply never looked up again and expire through the cache TTL
+and LRU culling.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from .models import CatalogState
+
+
+CACHE_ALIAS = 'recipes'
+STATE_CACHE_KEY = 'recipes:catalog_state'
+
+# When (epoch seconds) replicas are assumed to have replayed the last
+# catalog change this process has seen; recipe reads use the primary until then
+_replicas_current_at = 0.0
+
+
+def get_cache():
+    return caches[getattr(settings, 'RECIPES_CACHE_ALIAS', CACHE_ALIAS)]
+
+
+def get_catalog_version():
+    """
+    Current catalog version. The database value is cached for
+    RECIPES_CATALOG_VERSION_TTL seconds, which bounds how long another
+    process can keep serving an old version from a local cache.
+    """
+    cache = get_cache()
+    state = cache.get(STATE_CACHE_KEY)
+    if state is None:
+        row = CatalogState.objects.filter(pk=1).values_list('version', 'updated_at').first()
+        state = (row[0], row[1].timestamp()) if row else (0, None)
+        cache.set(STATE_CACHE_KEY, state, getattr(settings, 'RECIPES_CATALOG_VERSION_TTL', 2))
+    _note_catalog_change(state[1])
+    return state[0]
+
+
+def bump_catalog_version():
+    """
+    Increment the catalog version and return the new value.
+    """
+    state = CatalogState.objects.filter(pk=1)
+    if not state.update(version=F('version') + 1, updated_at=timezone.now()):
+        CatalogState.objects.get_or_create(pk=1)
+        state.update(version=F('version') + 1, updated_at=timezone.now())
+    version, updated_at = CatalogState.objects.values_list('version', 'updated_at').get(pk=1)
+    get_cache().set(
+        STATE_CACHE_KEY, (version, updated_at.timestamp()), getattr(settings, 'RECIPES_CATALOG_VERSION_TTL', 2)
+    )
+    _note_catalog_change(updated_at.timestamp())
+    return version
+
+
+def _note_catalog_change(changed_at):
+    global _replicas_current_at
+    if changed_at is not None:
+        _replicas_current_at = changed_at + getattr(settings, 'RECIPES_REPLICA_LAG', 10)
+
+
+def replicas_may_lag():
+    """
+    Whether the last catalog change this process has seen is recent enough
+    that read replicas may not have replayed it. Reads made meanwhile would
+    be cached under the new version with data from before the change.
+    """
+    return time.time() < _replicas_current_at
+
+
+def cached_count(queryset):
+    """
+    COUNT(*) of a queryset, memoized until the catalog version changes.
+    The key leaves out the database alias so read replicas share entries.
+    """
+    sql, params = queryset.query.sql_with_params()
+    raw = repr((get_catalog_version(), sql, params))
+    key = 'recipes:count:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    cache = get_cache()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count)
+    return count
+
+
+def request_fingerprint(request, version):
+    """
+    Digest of everything that determines a GET response: path, normalized
+    query parameters, negotiated content type and catalog version.
+    """
+    params = sorted((key, request.GET.getlist(key)) for key in request.GET)
+    raw = repr((version, request.path, params, request.META.get('HTTP_ACCEPT', '')))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class CachedResponseMixin:
+    """
+    Cache successful GET responses and answer conditional requests.
+
+    The ETag is derived from the request fingerprint, so a matching
+    If-None-Match is answered with 304 before any database or cache work
+    beyond reading the catalog version.
+    """
+    cached_headers = ('Vary', 'Allow')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        fingerprint = request_fingerprint(request, get_catalog_version())
+        etag = f'"{fingerprint}"'
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Accept',))
+            return response
+
+        cache = get_cache()
+        cache_key = f'recipes:response:{fingerprint}'
+        entry = cache.get(cache_key)
+        if entry is not None:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+            for header, value in entry['headers'].items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            response['ETag'] = etag
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if hasattr(response, 'render'):
+            response.render()
+        response['ETag'] = etag
+
+        # The browsable API embeds per-user data (CSRF token, username), so
+        # only JSON is stored.
+        if response['Content-Type'].startswith('application/json'):
+            cache.set(cache_key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'headers': {h: response[h] for h in self.cached_headers if response.has_header(h)},
+            })
+            response['X-Cache'] = 'MISS'
+        return response
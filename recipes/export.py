@@ -0,0 +1,86 @@
+"""
+Bulk export of the recipe catalog as NDJSON or CSV.
+
+Rows are read with QuerySet.iterator(), which uses a server-side cursor on
+PostgreSQL, and encoded one chunk at a time, so memory use does not grow
+with the size of the catalog. Shared by /api/recipes/export and the
+export_recipes management command.
+"""
+import csv
+import json
+
+from django_filters.utils import translate_validation
+from rest_framework.utils.encoders import JSONEncoder
+
+from .filters import RecipeFilter
+from .models import Recipe
+from .serializers import FastRecipeSerializer, RecipeSerializer, fetch_columns
+
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def encode_json(data):
+    # Same output as DRF's JSONRenderer with default settings
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def export_queryset(params, fields=None, request=None):
+    """
+    Recipes matching the search filters in `params`, as .values() rows
+    ordered by id unless the filters impose an order (q, sort).
+    Raises ValidationError for invalid filter values.
+    """
+    filterset = RecipeFilter(params, queryset=Recipe.objects.order_by('id'), request=request)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs.values(*fetch_columns(RecipeSerializer, fields, ('id',)))
+
+
+class _Echo:
+    """
+    File-like object whose write() returns the line instead of storing it.
+    """
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return encode_json(value)
+    return value
+
+
+def iter_export(rows, export_format, fields=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode .values() rows (typically queryset.iterator(chunk_size)) and
+    yield the export as text chunks of up to `chunk_size` records.
+    """
+    serializer = FastRecipeSerializer.compile(RecipeSerializer, fields)
+    columns = serializer.get_columns()
+
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow([name for name, _, _ in columns])
+
+        def encode(record):
+            return writer.writerow([_csv_cell(value) for value in record.values()])
+    else:
+        def encode(record):
+            return encode_json(record) + '\n'
+
+    chunk = []
+    for row in rows:
+        chunk.append(encode(serializer.to_representation(row, columns)))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
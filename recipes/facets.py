@@ -0,0 +1,128 @@
+"""
+Facet counts for recipe search results.
+
+Facets are computed with one GROUP BY per facet. Counts over the whole
+catalog are also stored in the FacetCount rollup table, refreshed by
+load_recipes, so unfiltered requests read a handful of rows instead of
+grouping every recipe. A rollup computed at an older catalog version is
+ignored until it is refreshed.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast, Floor
+
+from .models import CatalogState, FacetCount
+
+
+TERM_FACETS = {
+    'cuisine': 'cuisine',
+    'continent': 'continent',
+}
+
+# (lower, upper) rating ranges, highest first; the top bucket includes 5.0
+RATING_BUCKETS = [
+    (4.5, 5.0),
+    (4.0, 4.5),
+    (3.0, 4.0),
+    (2.0, 3.0),
+    (1.0, 2.0),
+    (0.0, 1.0),
+]
+
+# Facet name -> (column, bin width)
+HISTOGRAM_FACETS = {
+    'calories': ('calories_kcal', 100),
+    'total_time': ('total_time', 15),
+}
+
+
+def _term_buckets(queryset, column):
+    rows = queryset.values(column).annotate(count=Count('pk')).order_by('-count', F(column).asc(nulls_last=True))
+    return [{'value': row[column], 'count': row['count']} for row in rows]
+
+
+def _rating_buckets(queryset):
+    bucket = Case(
+        *[When(rating__gte=lower, then=Value(index)) for index, (lower, _) in enumerate(RATING_BUCKETS)],
+        output_field=IntegerField(),
+    )
+    counts = {
+        row['bucket']: row['count']
+        for row in queryset.annotate(bucket=bucket).values('bucket').annotate(count=Count('pk')).order_by()
+    }
+    buckets = [
+        {'min': lower, 'max': upper, 'count': counts[index]}
+        for index, (lower, upper) in enumerate(RATING_BUCKETS) if index in counts
+    ]
+    if None in counts:
+        buckets.append({'min': None, 'max': None, 'count': counts[None]})
+    return buckets
+
+
+def _histogram_buckets(queryset, column, width):
+    bucket = Floor(Cast(column, FloatField()) / Value(float(width)))
+    rows = queryset.annotate(bucket=bucket).values('bucket').annotate(count=Count('pk')).order_by(
+        F('bucket').asc(nulls_last=True)
+    )
+    return [
+        {
+            'min': None if row['bucket'] is None else row['bucket'] * width,
+            'max': None if row['bucket'] is None else (row['bucket'] + 1) * width,
+            'count': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def compute_facets(queryset):
+    """
+    Facet buckets for `queryset`, keyed by facet name. Buckets holding
+    recipes without a value have value (or min/max) None.
+    """
+    queryset = queryset.order_by()
+    facets = {name: _term_buckets(queryset, column) for name, column in TERM_FACETS.items()}
+    facets['rating'] = _rating_buckets(queryset)
+    for name, (column, width) in HISTOGRAM_FACETS.items():
+        facets[name] = _histogram_buckets(queryset, column, width)
+    return facets
+
+
+def refresh_facet_rollup(queryset, version, using=None):
+    """
+    Recompute catalog-wide facets from `queryset` (all recipes) and store
+    them as the rollup for catalog `version`.
+    """
+    facets = compute_facets(queryset)
+    rows = [
+        FacetCount(
+            facet=name,
+            position=position,
+            value=bucket.get('value'),
+            lower=bucket.get('min'),
+            upper=bucket.get('max'),
+            count=bucket['count'],
+        )
+        for name, buckets in facets.items()
+        for position, bucket in enumerate(buckets)
+    ]
+    with transaction.atomic(using=using):
+        FacetCount.objects.using(using).all().delete()
+        FacetCount.objects.using(using).bulk_create(rows)
+        CatalogState.objects.using(using).filter(pk=1).update(facets_version=version)
+    return len(rows)
+
+
+def load_facet_rollup(version):
+    """
+    Facets from the rollup table, or None if it was not computed at
+    catalog `version`.
+    """
+    if not CatalogState.objects.filter(pk=1, facets_version=version).exists():
+        return None
+    facets = {name: [] for name in list(TERM_FACETS) + ['rating'] + list(HISTOGRAM_FACETS)}
+    for row in FacetCount.objects.all():
+        if row.facet in TERM_FACETS:
+            facets[row.facet].append({'value': row.value, 'count': row.count})
+        elif row.facet in facets:
+            facets[row.facet].append({'min': row.lower, 'max': row.upper, 'count': row.count})
+    return facets
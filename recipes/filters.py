@@ -0,0 +1,256 @@
+"""
+Declarative filters for recipe search.
+
+Each query parameter maps to one typed filter whose ORM lookups are fixed
+when the FilterSet class is built, so a request only has to parse its
+values. Every numeric filter targets a plain indexed column.
+"""
+import re
+
+import django_filters
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, OuterRef, Q
+
+from .ingredients import ingredient_tokens
+from .models import Ingredient, Recipe, RecipeIngredient
+
+
+OPERATOR_RE = re.compile(r'^\s*(<=|>=|<|>|=)?\s*(.*?)\s*$')
+
+OPERATOR_LOOKUPS = {
+    '<=': 'lte',
+    '>=': 'gte',
+    '<': 'lt',
+    '>': 'gt',
+    '=': 'exact',
+}
+
+
+def parse_operator_value(param_value):
+    """
+    Parse parameter value with operator.
+    Returns (operator, value) tuple.
+    Supported operators: <=, >=, <, >, =
+    """
+    match = OPERATOR_RE.match(str(param_value))
+    return match.group(1) or '=', match.group(2)
+
+
+class QueryListWidget(forms.Widget):
+    """
+    Hands every value of a repeated query parameter to the form field.
+    """
+    def value_from_datadict(self, data, files, name):
+        if hasattr(data, 'getlist'):
+            return data.getlist(name)
+        value = data.get(name)
+        return [] if value is None else [value]
+
+
+class OperatorListField(forms.Field):
+    """
+    Cleans values such as '<=400' or '>=4.5' into (lookup, number) bounds.
+    """
+    widget = QueryListWidget
+
+    def __init__(self, coerce=float, unit=None, **kwargs):
+        self.coerce = coerce
+        self.unit = unit
+        super().__init__(**kwargs)
+
+    def to_python(self, values):
+        bounds = []
+        for raw in values or []:
+            operator, value = parse_operator_value(raw)
+            if self.unit:
+                value = value.replace(self.unit, '').strip()
+            if not value:
+                continue
+            try:
+                bounds.append((OPERATOR_LOOKUPS[operator], self.coerce(value)))
+            except (TypeError, ValueError):
+                raise forms.ValidationError(f'Invalid value {raw!r}. Use a number with an optional <=, >=, <, > or = prefix.')
+        return bounds
+
+
+class OperatorFilter(django_filters.Filter):
+    """
+    Numeric filter accepting one or more operator bounds, e.g.
+    total_time=>=30&total_time=<=60. All bounds must hold.
+    """
+    field_class = OperatorListField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.filter(*[Q(**{f'{self.field_name}__{lookup}': number}) for lookup, number in value])
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+
+class IngredientListField(forms.Field):
+    """
+    Cleans repeated or comma-separated ingredient terms into token lists.
+    """
+    widget = QueryListWidget
+    max_terms = 20
+
+    def to_python(self, values):
+        terms = []
+        for raw in values or []:
+            for term in raw.split(','):
+                tokens = ingredient_tokens(term)
+                if tokens and tokens not in terms:
+                    terms.append(tokens)
+        if len(terms) > self.max_terms:
+            raise forms.ValidationError(f'At most {self.max_terms} ingredients per filter.')
+        return terms
+
+
+class IngredientFilter(django_filters.Filter):
+    """
+    Recipes linked to ingredients matching the terms. A term matches every
+    ingredient whose name has all of the term's tokens ("olive oil" matches
+    "extra virgin olive oil"). Matching ingredient ids are looked up first
+    through the GIN index on Ingredient.tokens; recipes are then selected
+    with EXISTS semi-joins on the (ingredient, recipe) index.
+
+    With `exclude`, recipes matching any term are removed. Otherwise every
+    term must match, or any of them when the filterset's `match_param`
+    is "any".
+    """
+    field_class = IngredientListField
+
+    def __init__(self, *args, exclude=False, match_param='ingredient_match', **kwargs):
+        self.match_param = match_param
+        super().__init__(*args, exclude=exclude, **kwargs)
+
+    def term_ingredient_ids(self, terms, using=None):
+        """
+        Ids of the ingredients matching each term, from a single query.
+        """
+        wanted = sorted({token for tokens in terms for token in tokens})
+        candidates = [
+            (pk, set(tokens))
+            for pk, tokens in Ingredient.objects.using(using).filter(tokens__overlap=wanted).values_list('id', 'tokens')
+        ]
+        return [[pk for pk, tokens in candidates if tokens.issuperset(term)] for term in terms]
+
+    def linked(self, ingredient_ids):
+        return Exists(RecipeIngredient.objects.filter(recipe=OuterRef('pk'), ingredient_id__in=ingredient_ids))
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        matches = self.term_ingredient_ids(value, qs.db)
+        if self.exclude or self.parent.form.cleaned_data.get(self.match_param) == 'any':
+            ingredient_ids = sorted({pk for ids in matches for pk in ids})
+            if not ingredient_ids:
+                return qs if self.exclude else qs.none()
+            if self.exclude:
+                return qs.exclude(self.linked(ingredient_ids))
+            return qs.filter(self.linked(ingredient_ids))
+        if not all(matches):
+            return qs.none()
+        return qs.filter(*[self.linked(ids) for ids in matches])
+
+
+class StableOrderingFilter(django_filters.OrderingFilter):
+    """
+    OrderingFilter that breaks ties on id so pages never overlap.
+    """
+    def filter(self, qs, value):
+        if value in django_filters.constants.EMPTY_VALUES:
+            return qs
+        ordering = [self.get_ordering_value(param) for param in value]
+        return qs.order_by(*ordering, 'id')
+
+
+class RecipeFilter(django_filters.FilterSet):
+    """
+    Search filters for /api/recipes/search.
+
+    Numeric filters also accept the bare comparison form, so
+    `total_time>=30&total_time<=60` is read as total_time=>=30 and
+    total_time=<=60.
+    """
+    calories = OperatorFilter(field_name='calories_kcal', unit='kcal')
+    protein = OperatorFilter(field_name='protein_g', unit='g')
+    carbohydrates = OperatorFilter(field_name='carbohydrates_g', unit='g')
+    fat = OperatorFilter(field_name='fat_g', unit='g')
+    rating = OperatorFilter(field_name='rating')
+    total_time = OperatorFilter(field_name='total_time', coerce=int)
+    prep_time = OperatorFilter(field_name='prep_time', coerce=int)
+    cook_time = OperatorFilter(field_name='cook_time', coerce=int)
+
+    title = django_filters.CharFilter(field_name='title', lookup_expr='icontains')
+    cuisine = django_filters.CharFilter(field_name='cuisine', lookup_expr='icontains')
+    cuisine_in = CharInFilter(field_name='cuisine', lookup_expr='in')
+    continent_in = CharInFilter(field_name='continent', lookup_expr='in')
+
+    ingredient = IngredientFilter()
+    exclude_ingredient = IngredientFilter(exclude=True)
+    # Read by `ingredient`: all (default) or any of its terms must match
+    ingredient_match = django_filters.ChoiceFilter(
+        choices=(('all', 'all'), ('any', 'any')),
+        method='filter_noop',
+    )
+
+    q = django_filters.CharFilter(method='filter_search')
+
+    # Declared last so an explicit sort overrides the relevance order of q
+    sort = StableOrderingFilter(
+        fields=(
+            ('rating', 'rating'),
+            ('title', 'title'),
+            ('total_time', 'total_time'),
+            ('prep_time', 'prep_time'),
+            ('cook_time', 'cook_time'),
+            ('calories_kcal', 'calories'),
+            ('created_at', 'created_at'),
+        ),
+    )
+
+    class Meta:
+        model = Recipe
+        fields = []
+
+    def __init__(self, data=None, *args, **kwargs):
+        if data is not None:
+            data = self.normalize_comparisons(data)
+        super().__init__(data, *args, **kwargs)
+
+    @classmethod
+    def normalize_comparisons(cls, data):
+        """
+        Fold `name>=value` / `name<=value` (parsed by the query string as
+        key 'name>' / 'name<') into operator values of `name`.
+        """
+        if not hasattr(data, 'getlist'):
+            return data
+        suffixed = [
+            key for key in data
+            if key[-1:] in ('<', '>') and isinstance(cls.base_filters.get(key[:-1]), OperatorFilter)
+        ]
+        if not suffixed:
+            return data
+        data = data.copy()
+        for key in suffixed:
+            name, operator = key[:-1], key[-1] + '='
+            data.setlist(name, data.getlist(name) + [operator + value for value in data.pop(key)])
+        return data
+
+    def filter_noop(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """
+        Full-text search against the stored search_vector, best matches first.
+        """
+        search_query = SearchQuery(value, config='english', search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-rating', 'title')
@@ -0,0 +1,264 @@
+"""
+Parallel, resumable ingestion of large recipe dumps.
+
+The input is a JSON document, a JSONL file (one recipe per line) or a
+directory of such shards. It is cut into tasks that a pool of worker
+processes parses, validates and cleans (see recipes.validation):
+
+- JSONL files are split into byte ranges of `range_bytes`, so even a
+  single multi-GB file is parsed on every core.
+- JSON shards up to `range_bytes` are parsed whole by a worker.
+- Larger JSON documents are parsed by the main process and their raw
+  records sent to the workers in batches for cleaning.
+
+Cleaned batches go to a BatchWriter, whose bounded queue blocks the main
+process when the database falls behind; the main process in turn keeps at
+most two tasks per worker in flight, so memory stays bounded.
+
+The workers return their rejected records and stage timings together
+with the cleaned batches; the main process reports them.
+
+Every batch is written in one transaction together with a LoadCheckpoint
+row naming it. A crashed load restarted with `resume` skips the batches
+already committed and loads only the rest, without duplicates. Batch
+boundaries are a function of the input and the batch/range sizes, which
+are part of the run key.
+"""
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.db import transaction
+
+from .ingredients import prepare_ingredient_names
+from .loader import DEFAULT_BATCH_SIZE, BatchWriter, batched, iter_json_records
+from .models import LoadCheckpoint
+from .validation import InvalidJSON, LoadReport, ReportingWrite, clean_records
+
+
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+SHARD_SUFFIXES = ('.json',) + JSONL_SUFFIXES
+
+DEFAULT_RANGE_BYTES = 8 * 2 ** 20
+
+
+def input_files(path):
+    """
+    The files to load: `path` itself, or the shards of a directory in name order.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        if not path.exists():
+            raise FileNotFoundError(path)
+        return [path]
+    return sorted(child for child in path.iterdir() if child.is_file() and child.suffix in SHARD_SUFFIXES)
+
+
+def is_jsonl(path):
+    return Path(path).suffix in JSONL_SUFFIXES
+
+
+def run_key(files, mode, batch_size, range_bytes):
+    """
+    Identifies a load for checkpointing: the same input files (by name,
+    size and modification time) loaded with the same settings.
+    """
+    state = [[str(Path(name).resolve()), os.stat(name).st_size, os.stat(name).st_mtime_ns] for name in files]
+    raw = json.dumps([state, mode, batch_size, range_bytes])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def iter_jsonl_range(path, start, end):
+    """
+    (byte offset, record) of the lines of a JSONL file that start at an
+    offset in [start, end). A line crossing `end` belongs to this range;
+    one crossing `start` to the previous one. Lines that are not valid JSON
+    come out as InvalidJSON records.
+    """
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        offset = f.tell()
+        while offset < end:
+            line = f.readline()
+            if not line:
+                return
+            if line.strip():
+                try:
+                    yield offset, json.loads(line)
+                except ValueError as e:
+                    yield offset, InvalidJSON(line.decode('utf-8', 'replace').rstrip('\r\n'), str(e))
+            offset += len(line)
+
+
+def iter_json_file(path):
+    """
+    (index, record) of the records of a JSON document.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from enumerate(iter_json_records(f))
+
+
+def clean_task(task, batch_size, done=frozenset()):
+    """
+    Parse, validate and clean one task in a worker process. `done` holds
+    the indexes of this task's batches that are already loaded. Returns
+    the cleaned batches as [(batch key, recipes)], a Counter of read and
+    resumed (already loaded, not cleaned again) records, the rejections
+    and the seconds spent parsing and cleaning.
+    """
+    kind, key, path = task[:3]
+    if kind == 'records':
+        raw_batches = iter([task[3]])
+    elif kind == 'jsonl':
+        raw_batches = batched(iter_jsonl_range(path, *task[3:]), batch_size)
+    else:
+        raw_batches = batched(iter_json_file(path), batch_size)
+
+    batches, counts, rejected, seconds = [], Counter(), [], Counter()
+    for number in itertools.count():
+        started = time.perf_counter()
+        raw = next(raw_batches, None)
+        seconds['parse'] += time.perf_counter() - started
+        if raw is None:
+            break
+        counts['read'] += len(raw)
+        if number in done:
+            counts['resumed'] += len(raw)
+            continue
+        started = time.perf_counter()
+        recipes, batch_rejected = clean_records(raw, path)
+        for recipe in recipes:
+            prepare_ingredient_names(recipe)
+        seconds['clean'] += time.perf_counter() - started
+        rejected.extend(batch_rejected)
+        batches.append((f'{key}#{number}', recipes))
+    return batches, counts, rejected, seconds
+
+
+def plan_tasks(files, root, batch_size, range_bytes):
+    """
+    Yield the tasks for `files`. Keys are made from paths relative to
+    `root` so a resumed run matches them regardless of the working
+    directory. Tasks are (kind, key, file, *arguments); record tasks carry
+    their (index, raw record) pairs and hold one batch.
+    """
+    for path in files:
+        name = str(path.relative_to(root)) if path != root else path.name
+        size = path.stat().st_size
+        if is_jsonl(path):
+            for start in range(0, size, range_bytes):
+                yield ('jsonl', f'{name}:{start}', str(path), start, min(start + range_bytes, size))
+        elif size <= range_bytes:
+            yield ('json', name, str(path))
+        else:
+            for number, records in enumerate(batched(iter_json_file(path), batch_size)):
+                yield ('records', f'{name}@{number}', str(path), records)
+
+
+class CheckpointedWrite:
+    """
+    Wraps a loader write function (bulk_insert, copy_insert, sync_batch)
+    to take (batch key, recipes) items and record the key in the batch's
+    transaction.
+    """
+    def __init__(self, write, run):
+        self.write = write
+        self.run = run
+        self.__name__ = write.__name__
+
+    def __call__(self, item, using='default'):
+        key, recipes = item
+        with transaction.atomic(using=using):
+            counts = self.write(recipes, using=using) if recipes else Counter()
+            LoadCheckpoint.objects.using(using).create(run=self.run, batch=key)
+        return counts
+
+
+def parallel_load(path, write, processes=None, writers=1, batch_size=DEFAULT_BATCH_SIZE,
+                  range_bytes=DEFAULT_RANGE_BYTES, resume=False, using='default', progress=None, report=None):
+    """
+    Load `path` with `processes` cleaning processes (default: CPU count;
+    1 cleans inline) and `writers` database writer threads. With `resume`,
+    batches committed by an earlier run of the same load are skipped;
+    otherwise its checkpoints are discarded. Checkpoints are removed once
+    the load completes. `progress(writer)` is called after every task.
+    Rejections and stage timings go to `report` (a LoadReport).
+
+    Returns a Counter of created/updated/unchanged/duplicate rows,
+    ingredient_links, and read/resumed records.
+    """
+    report = report or LoadReport()
+    root = Path(path)
+    files = input_files(root)
+    run = run_key(files, write.__name__, batch_size, range_bytes)
+    checkpoints = LoadCheckpoint.objects.using(using).filter(run=run)
+    done = {}
+    if resume:
+        for batch in checkpoints.values_list('batch', flat=True).iterator():
+            key, _, number = batch.rpartition('#')
+            done.setdefault(key, set()).add(int(number))
+    else:
+        checkpoints.delete()
+
+    processes = processes or os.cpu_count() or 1
+    pool = None
+    if processes > 1:
+        # Spawned workers share no database connections or threads with
+        # this process; django.setup() is their initializer
+        pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup)
+    writer = BatchWriter(CheckpointedWrite(ReportingWrite(write, report), run), workers=writers, using=using)
+    counts = Counter()
+    pending = deque()
+
+    def submit(task, task_done):
+        if pool is not None:
+            return pool.submit(clean_task, task, batch_size, task_done)
+        future = Future()
+        future.set_result(clean_task(task, batch_size, task_done))
+        return future
+
+    def drain():
+        batches, task_counts, rejected, seconds = pending.popleft().result()
+        counts.update(task_counts)
+        report.reject(rejected)
+        for stage, stage_seconds in seconds.items():
+            report.add_time(stage, stage_seconds)
+        for batch in batches:
+            writer.submit(batch)
+        if progress is not None:
+            progress(writer)
+
+    try:
+        tasks = plan_tasks(files, root, batch_size, range_bytes)
+        while True:
+            # Large JSON documents are parsed here, while planning
+            with report.stage('parse'):
+                task = next(tasks, None)
+            if task is None:
+                break
+            task_done = frozenset(done.get(task[1], ()))
+            if task[0] == 'records' and task_done:
+                counts.update(read=len(task[3]), resumed=len(task[3]))
+                continue
+            pending.append(submit(task, task_done))
+            # Bounded look-ahead; drain() blocks while the writer queue is full
+            while len(pending) >= 2 * processes:
+                drain()
+        while pending:
+            drain()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        written = writer.close()
+
+    checkpoints.delete()
+    return counts + written
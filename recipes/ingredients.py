@@ -0,0 +1,171 @@
+"""
+Normalized ingredient index.
+
+Raw ingredient lines such as "2 (8 ounce) packages cream cheese, softened"
+are reduced to a lowercase name ("cream cheese") by dropping quantities,
+units, parentheticals and preparation notes. Each distinct name is one
+Ingredient row with its stemmed tokens; RecipeIngredient links recipes to
+names. Searches match query terms against the tokens, so "egg" finds
+"eggs" and "olive oil" finds "extra virgin olive oil".
+"""
+import re
+
+from django.db import connections, transaction
+
+from .models import Ingredient, RecipeIngredient
+
+
+# Leading words of an ingredient line that are not part of its name
+LEADING_WORDS = frozenset('''
+    a an of about approximately heaping level scant
+    cup cups c tablespoon tablespoons tbsp tbs tbl teaspoon teaspoons tsp
+    pound pounds lb lbs ounce ounces oz fluid fl gram grams g kilogram kilograms kg
+    milliliter milliliters ml liter liters l quart quarts qt pint pints pt gallon gallons
+    can cans package packages pkg jar jars bottle bottles container containers box boxes
+    bag bags bunch bunches head heads stalk stalks sprig sprigs slice slices piece pieces
+    clove cloves pinch pinches dash dashes drop drops stick sticks envelope envelopes
+    sheet sheets packet packets inch inches x
+    large small medium whole
+'''.split())
+
+# Preparation words; a comma-separated part made only of these (and
+# leading words) is not the name, as in "skinless, boneless chicken breasts"
+PREPARATION_WORDS = frozenset('''
+    skinless boneless peeled unpeeled seeded pitted cored trimmed chopped diced minced
+    sliced grated shredded crushed cubed halved quartered fresh frozen thawed cooked
+    uncooked softened melted divided drained rinsed packed sifted beaten room temperature
+    finely coarsely roughly thinly lightly or
+'''.split())
+
+# Words ignored when matching names and query terms
+STOP_WORDS = frozenset('and or of for to the a an with into plus as needed taste optional'.split())
+
+MAX_NAME_LENGTH = 255
+
+_PARENTHETICAL = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+
+def stem(word):
+    """
+    Fold common English plural endings so singular and plural forms match.
+    """
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(text):
+    """
+    Lowercase ingredient name from a raw ingredient line, or None.
+    """
+    if not isinstance(text, str):
+        return None
+    text = _PARENTHETICAL.sub(' ', text.lower())
+    # The name is the first comma-separated part that is more than
+    # quantities and preparation words; notes follow: "onion, finely chopped"
+    for part in text.split(','):
+        words = _WORD.findall(part)
+        while words and words[0] in LEADING_WORDS:
+            words.pop(0)
+        if any(word not in PREPARATION_WORDS for word in words):
+            return ' '.join(words)[:MAX_NAME_LENGTH].strip()
+    return None
+
+
+def ingredient_tokens(text):
+    """
+    Sorted, de-duplicated stemmed tokens of an ingredient name or query term.
+    """
+    return sorted({stem(word) for word in _WORD.findall(text.lower()) if word not in STOP_WORDS})
+
+
+def ingredient_names(ingredients):
+    """
+    Distinct normalized names of a recipe's raw `ingredients` list, in order.
+    """
+    if not isinstance(ingredients, list):
+        return []
+    names = []
+    for line in ingredients:
+        name = normalize_ingredient(line)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def prepare_ingredient_names(recipe):
+    """
+    Normalize a recipe's ingredient names ahead of index_ingredients(),
+    e.g. in the parallel loader's worker processes.
+    """
+    recipe._ingredient_names = ingredient_names(recipe.ingredients)
+    return recipe
+
+
+def ingredient_ids(names, using='default'):
+    """
+    Map names to Ingredient ids, creating the missing rows.
+    Concurrent loaders may create the same names; conflicts are ignored
+    and the winners' rows read back.
+    """
+    manager = Ingredient.objects.using(using)
+    ids = dict(manager.filter(name__in=names).values_list('name', 'id'))
+    missing = sorted(name for name in names if name not in ids)
+    if missing:
+        manager.bulk_create(
+            [Ingredient(name=name, tokens=ingredient_tokens(name)) for name in missing],
+            ignore_conflicts=True,
+        )
+        ids.update(manager.filter(name__in=missing).values_list('name', 'id'))
+    return ids
+
+
+def insert_links(recipe_ids, ingredient_ids, using='default'):
+    """
+    Write RecipeIngredient rows for the paired id lists. On PostgreSQL this
+    is a single INSERT ... SELECT FROM unnest() of two arrays, which skips
+    building a model instance per link.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        RecipeIngredient.objects.using(using).bulk_create(
+            [RecipeIngredient(recipe_id=r, ingredient_id=i) for r, i in zip(recipe_ids, ingredient_ids)],
+            batch_size=5000,
+        )
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO %s (recipe_id, ingredient_id) SELECT * FROM unnest(%%s::bigint[], %%s::bigint[])'
+            % quote(RecipeIngredient._meta.db_table),
+            [list(recipe_ids), list(ingredient_ids)],
+        )
+
+
+def index_ingredients(recipes, using='default', replace=False):
+    """
+    Link saved recipes to their normalized ingredients in bulk.
+    With `replace`, existing links of these recipes are removed first.
+    Returns the number of links written.
+    """
+    names = {}
+    for recipe in recipes:
+        prepared = getattr(recipe, '_ingredient_names', None)
+        names[recipe.pk] = ingredient_names(recipe.ingredients) if prepared is None else prepared
+    with transaction.atomic(using=using):
+        if replace:
+            RecipeIngredient.objects.using(using).filter(recipe_id__in=list(names)).delete()
+        ids = ingredient_ids({name for recipe_names in names.values() for name in recipe_names}, using)
+        recipe_ids, linked_ids = [], []
+        for pk, recipe_names in names.items():
+            for name in recipe_names:
+                recipe_ids.append(pk)
+                linked_ids.append(ids[name])
+        if recipe_ids:
+            insert_links(recipe_ids, linked_ids, using)
+    return len(recipe_ids)
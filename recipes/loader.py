@@ -0,0 +1,481 @@
+"""
+Streaming helpers used by the load_recipes management command.
+
+Recipe dumps are parsed incrementally, one record at a time, and written in
+batches so neither the whole document nor the whole catalog of model
+instances has to sit in memory.
+"""
+import hashlib
+import io
+import json
+import math
+import queue
+import re
+import threading
+from collections import Counter
+
+from django.db import connections, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ingredients import index_ingredients
+from .models import NUTRIENT_COLUMNS, Recipe
+
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_SCALAR_END = re.compile(r'[\s,:\]}]')
+_decoder = json.JSONDecoder()
+
+# Source-derived columns. These are what the content hash covers and what a
+# sync run rewrites when a recipe has changed.
+CONTENT_FIELDS = [
+    'title',
+    'cuisine',
+    'rating',
+    'prep_time',
+    'cook_time',
+    'total_time',
+    'description',
+    'serves',
+    'nutrients',
+    'continent',
+    'country_state',
+    'url',
+    'ingredients',
+    'instructions',
+]
+
+
+def clean_numeric(value):
+    """
+    Convert a raw value to float, mapping NaN and garbage to None.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    try:
+        number = float(value) if isinstance(value, (int, float, str)) else None
+    except (ValueError, TypeError):
+        return None
+    # Strings such as 'NaN' parse to NaN as well
+    return None if number != number else number
+
+
+def clean_int(value):
+    """
+    Convert a raw value to int, mapping NaN and garbage to None.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    try:
+        return int(float(value)) if isinstance(value, (int, float, str)) else None
+    except (ValueError, TypeError):
+        return None
+
+
+def clean_json(value):
+    """
+    Copy of a raw JSON value with NaN and Infinity, which jsonb cannot
+    store, replaced by None.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    # Strings are by far the most common items; skip the call for them
+    if isinstance(value, dict):
+        return {key: item if type(item) is str else clean_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [item if type(item) is str else clean_json(item) for item in value]
+    return value
+
+
+def build_recipe(recipe_data):
+    """
+    Build an unsaved Recipe from one raw JSON record.
+    Returns None when the record has no usable title.
+    """
+    title = recipe_data.get('title')
+    if title:
+        title = title.strip()
+
+    if not title:
+        return None
+
+    recipe = Recipe(
+        title=title,
+        cuisine=recipe_data.get('cuisine'),
+        rating=clean_numeric(recipe_data.get('rating')),
+        prep_time=clean_int(recipe_data.get('prep_time')),
+        cook_time=clean_int(recipe_data.get('cook_time')),
+        total_time=clean_int(recipe_data.get('total_time')),
+        description=recipe_data.get('description'),
+        serves=recipe_data.get('serves'),
+        nutrients=clean_json(recipe_data.get('nutrients')),
+        continent=recipe_data.get('Contient'),  # Note: typo in original JSON
+        country_state=recipe_data.get('Country_State'),
+        url=recipe_data.get('URL'),
+        ingredients=clean_json(recipe_data.get('ingredients')),
+        instructions=clean_json(recipe_data.get('instructions')),
+    )
+    recipe.fill_nutrient_columns()
+    recipe.content_hash = content_hash(recipe)
+    return recipe
+
+
+def content_hash(recipe):
+    """
+    Stable SHA-256 over the recipe's content fields.
+    """
+    payload = json.dumps(
+        [getattr(recipe, name) for name in CONTENT_FIELDS],
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _StreamReader:
+    """
+    Minimal pull parser over a text file object.
+    Only the unconsumed tail of the input is kept in the buffer.
+    """
+
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        # Position of the buffer in the input, for error messages
+        self.offset = 0
+        self.lines = 0
+        self.line_start = 0
+
+    def _fill(self):
+        # Grow reads geometrically so a single huge record is not re-decoded
+        # once per chunk.
+        chunk = self.fp.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        newlines = self.buf.count('\n', 0, self.pos)
+        if newlines:
+            self.lines += newlines
+            self.line_start = self.offset + self.buf.rindex('\n', 0, self.pos) + 1
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character ('' at end of input).
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def advance(self):
+        self.pos += 1
+
+    def error(self, message, pos=None):
+        """
+        JSONDecodeError at `pos` in the buffer, with the line, column and
+        character offset in the whole input.
+        """
+        pos = self.pos if pos is None else pos
+        error = json.JSONDecodeError(message, self.buf, pos)
+        newlines = self.buf.count('\n', 0, pos)
+        error.pos = self.offset + pos
+        error.lineno = self.lines + newlines + 1
+        if newlines:
+            error.colno = pos - self.buf.rindex('\n', 0, pos)
+        else:
+            error.colno = error.pos - self.line_start + 1
+        error.args = (f'{message}: line {error.lineno} column {error.colno} (char {error.pos})',)
+        return error
+
+    def truncated(self, error):
+        """
+        Whether a decode error may just be the buffer ending mid-value: the
+        string or token it points at runs to the end of the buffer.
+        """
+        if error.msg.startswith('Unterminated string'):
+            return True
+        return not _SCALAR_END.search(self.buf, error.pos)
+
+    def value(self):
+        """
+        Decode the next complete JSON value.
+        """
+        if not self.peek():
+            raise self.error('Unexpected end of input')
+        # Bare scalars (numbers, literals) have no closing delimiter, so make
+        # sure the whole token is buffered before decoding it.
+        if self.buf[self.pos] not in '{["':
+            while not _SCALAR_END.search(self.buf, self.pos) and self._fill():
+                pass
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # Read on only while the value is incomplete, so a malformed
+                # record fails here instead of pulling in the rest of the file
+                if self.truncated(e) and self._fill():
+                    continue
+                raise self.error(e.msg, e.pos) from None
+            self.pos = end
+            return obj
+
+
+def iter_json_records(fp, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the records of a JSON document whose top level is either a list
+    of recipes or a dict mapping ids to recipes, without loading it whole.
+    """
+    reader = _StreamReader(fp, chunk_size)
+    opening = reader.peek()
+    if opening not in ('{', '['):
+        raise reader.error('Expecting a JSON object or array')
+    closing = '}' if opening == '{' else ']'
+    reader.advance()
+
+    if reader.peek() == closing:
+        return
+
+    while True:
+        if opening == '{':
+            reader.value()
+            if reader.peek() != ':':
+                raise reader.error("Expecting ':' delimiter")
+            reader.advance()
+
+        yield reader.value()
+
+        separator = reader.peek()
+        if separator == closing:
+            return
+        if separator != ',':
+            raise reader.error("Expecting ',' delimiter")
+        reader.advance()
+
+
+def batched(iterable, size):
+    """
+    Group an iterable into lists of at most `size` items.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(recipes, using='default'):
+    """
+    Insert a batch of recipes in a single transaction and statement,
+    together with their ingredient index entries.
+    """
+    with transaction.atomic(using=using):
+        Recipe.objects.using(using).bulk_create(recipes, batch_size=len(recipes))
+        links = index_ingredients(recipes, using=using)
+    return Counter(created=len(recipes), ingredient_links=links)
+
+
+def sync_batch(recipes, using='default'):
+    """
+    Upsert a batch of recipes against what is already stored.
+
+    Recipes are matched on `url` when they have one and on `content_hash`
+    otherwise. Matches whose hash is unchanged are skipped, changed ones are
+    rewritten with a single bulk_update, and the rest are inserted. Only
+    rewritten rows get a new `updated_at`.
+
+    Matching and inserting are not atomic against other writers, since
+    `url` is not unique; batches must be synced one at a time.
+    """
+    by_url = {}
+    by_hash = {}
+    for recipe in recipes:
+        if recipe.url:
+            by_url[recipe.url] = recipe
+        else:
+            by_hash[recipe.content_hash] = recipe
+
+    existing = (
+        Recipe.objects.using(using)
+        .filter(
+            Q(url__in=list(by_url))
+            | (Q(content_hash__in=list(by_hash)) & (Q(url__isnull=True) | Q(url='')))
+        )
+        .order_by('id')
+        .values_list('id', 'url', 'content_hash')
+    )
+
+    counts = Counter()
+    to_update = []
+    now = timezone.now()
+    for pk, url, stored_hash in existing:
+        if url:
+            recipe = by_url.pop(url, None)
+        else:
+            recipe = by_hash.pop(stored_hash, None)
+        if recipe is None:
+            # Duplicate rows for the same key; only the oldest is tracked.
+            continue
+        if recipe.content_hash == stored_hash:
+            counts['unchanged'] += 1
+            continue
+        recipe.pk = pk
+        recipe.updated_at = now
+        to_update.append(recipe)
+
+    to_create = list(by_url.values()) + list(by_hash.values())
+    counts['duplicate'] = len(recipes) - counts['unchanged'] - len(to_update) - len(to_create)
+
+    with transaction.atomic(using=using):
+        if to_update:
+            Recipe.objects.using(using).bulk_update(
+                to_update,
+                CONTENT_FIELDS + list(NUTRIENT_COLUMNS) + ['content_hash', 'updated_at'],
+                batch_size=len(to_update),
+            )
+            counts['ingredient_links'] += index_ingredients(to_update, using=using, replace=True)
+        if to_create:
+            Recipe.objects.using(using).bulk_create(to_create, batch_size=len(to_create))
+            counts['ingredient_links'] += index_ingredients(to_create, using=using)
+
+    counts['updated'] += len(to_update)
+    counts['created'] += len(to_create)
+    return +counts
+
+
+def _copy_value(field, obj):
+    value = field.pre_save(obj, True)
+    if value is None:
+        return '\\N'
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value, allow_nan=False)
+    elif hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return '"%s"' % str(value).replace('"', '""')
+
+
+def reserve_ids(count, using='default'):
+    """
+    Draw `count` ids from the recipe id sequence, so rows written with COPY
+    (which returns nothing) have known primary keys.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [Recipe._meta.db_table, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def copy_insert(recipes, using='default'):
+    """
+    Insert a batch of recipes with PostgreSQL COPY FROM STDIN.
+    Much faster than INSERT for large loads but bypasses the ORM, so
+    only concrete column values are written.
+    """
+    fields = Recipe._meta.concrete_fields
+    for recipe, pk in zip(recipes, reserve_ids(len(recipes), using)):
+        recipe.pk = pk
+    buf = io.StringIO()
+    for obj in recipes:
+        buf.write(','.join(_copy_value(f, obj) for f in fields))
+        buf.write('\n')
+    buf.seek(0)
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql = "COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '\\N')" % (
+        quote(Recipe._meta.db_table),
+        ', '.join(quote(f.column) for f in fields),
+    )
+    with transaction.atomic(using=using):
+        # copy_expert() is a driver method; map its errors to Django's like execute()
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            cursor.copy_expert(sql, buf)
+        links = index_ingredients(recipes, using=using)
+    return Counter(created=len(recipes), ingredient_links=links)
+
+
+def supports_copy(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+class BatchWriter:
+    """
+    Feed batches to `write` either inline or from a pool of writer threads.
+
+    With more than one worker, batches go through a bounded queue so the
+    parser blocks instead of racing ahead of the database. Each thread uses
+    its own database connection. `write` returns a Counter of outcomes
+    which are summed into `counts`.
+    """
+
+    def __init__(self, write, workers=1, using='default'):
+        self.write = write
+        self.workers = max(1, workers)
+        self.using = using
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._error = None
+        self._threads = []
+        if self.workers > 1:
+            self._queue = queue.Queue(maxsize=self.workers * 2)
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._run, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._queue.get()
+                if batch is None:
+                    return
+                if self._error is not None:
+                    continue
+                try:
+                    counts = self.write(batch, using=self.using)
+                except Exception as e:
+                    self._error = e
+                    continue
+                with self._lock:
+                    self.counts.update(counts)
+        finally:
+            connections[self.using].close()
+
+    def submit(self, batch):
+        if self._error is not None:
+            raise self._error
+        if not self._threads:
+            self.counts.update(self.write(batch, using=self.using))
+            return
+        self._queue.put(batch)
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.counts
+
+    @property
+    def written(self):
+        return self.counts['created'] + self.counts['updated']
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from recipes.cache import get_catalog_version
+from recipes.models import Recipe
+from recipes.similarity import DEFAULT_DIM, DEFAULT_K, NUMERIC_FEATURES, build_index, index_dir, is_available
+
+
+class Command(BaseCommand):
+    help = 'Build the precomputed similar-recipes index served by /api/recipes/<id>/similar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dim',
+            type=int,
+            default=DEFAULT_DIM,
+            help=f'Length of each feature vector (default: {DEFAULT_DIM})'
+        )
+        parser.add_argument(
+            '-k', '--k',
+            type=int,
+            default=DEFAULT_K,
+            help=f'Neighbours stored per recipe, the most /similar can return (default: {DEFAULT_K})'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Recipes compared per matrix product (default: sized to the catalog)'
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Index directory (default: RECIPES_SIMILARITY_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        if not is_available():
+            raise CommandError('NumPy is required to build the similarity index')
+        if options['dim'] <= len(NUMERIC_FEATURES):
+            raise CommandError(f'--dim must be larger than {len(NUMERIC_FEATURES)}')
+        if options['k'] < 1:
+            raise CommandError('--k must be at least 1')
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        directory = options['output'] or index_dir()
+        self.stdout.write(self.style.SUCCESS(f'Building similarity index in {directory}...'))
+        # Read from the primary; a replica may not have caught up yet
+        stats = build_index(
+            Recipe.objects.using(DEFAULT_DB_ALIAS),
+            directory,
+            dim=options['dim'],
+            k=options['k'],
+            chunk_size=options['chunk_size'],
+            catalog_version=get_catalog_version(),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Indexed {stats["count"]} recipes ({stats["dim"]} dimensions, {stats["k"]} neighbours each) '
+                f'as {stats["build"]}'
+            )
+        )
+        self.stdout.write(
+            f'Features in {stats["features_seconds"]:.2f}s, neighbours in {stats["neighbors_seconds"]:.2f}s, '
+            f'{stats["bytes"] / 2 ** 20:.1f} MiB on disk'
+        )
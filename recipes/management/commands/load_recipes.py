@@ -1,7 +1,13 @@
 import json
-import math
-from django.core.management.base import BaseCommand
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from recipes.cache import bump_catalog_version, get_catalog_version
+from recipes.facets import refresh_facet_rollup
+from recipes.ingest import DEFAULT_RANGE_BYTES, parallel_load
+from recipes.loader import DEFAULT_BATCH_SIZE, bulk_insert, copy_insert, supports_copy, sync_batch
 from recipes.models import Recipe
+from recipes.validation import LoadReport
 
 
 class Command(BaseCommand):
@@ -11,99 +17,198 @@ class Command(BaseCommand):
         parser.add_argument(
             'json_file',
             type=str,
-            help='Path to JSON file containing recipes'
+            help='Path to a JSON or JSONL (.jsonl/.ndjson) file of recipes, or a directory of such shards'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of recipes written per INSERT/COPY (default: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of concurrent writer connections (default: 1)'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Processes parsing and cleaning records in parallel; 0 uses every CPU (default: 1)'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the batches an interrupted run of the same load already committed'
+        )
+        parser.add_argument(
+            '--range-mb',
+            type=int,
+            default=DEFAULT_RANGE_BYTES // 2 ** 20,
+            help='Size of the pieces JSONL files are split into for the processes '
+                 f'(default: {DEFAULT_RANGE_BYTES // 2 ** 20})'
+        )
+        parser.add_argument(
+            '--dead-letter',
+            metavar='FILE',
+            help='Write rejected records with the reason to this JSONL file '
+                 '(appended to with --resume, replaced otherwise)'
+        )
+        parser.add_argument(
+            '--report',
+            metavar='FILE',
+            help='Write the load summary (counts, rejections by error, seconds per stage) as JSON'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Use PostgreSQL COPY FROM STDIN instead of batched INSERTs'
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Incremental sync: match existing recipes by URL (or content hash), '
+                 'skip unchanged ones and update only those that changed'
         )
 
     def handle(self, *args, **options):
         json_file = options['json_file']
-
-        self.stdout.write(self.style.SUCCESS(f'Loading recipes from {json_file}...'))
-
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                recipes_data = json.load(f)
-
-            self.stdout.write(f'Found {len(recipes_data)} recipes in JSON file')
-
-            # Clear existing recipes (optional - comment out if you want to keep existing data)
-            # Recipe.objects.all().delete()
-            # self.stdout.write(self.style.WARNING('Cleared existing recipes'))
-
-            created_count = 0
-            skipped_count = 0
-
-            # Handle both list and dict formats
-            if isinstance(recipes_data, dict):
-                recipes_list = recipes_data.values()
+        batch_size = options['batch_size']
+        workers = options['workers']
+
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+        if options['processes'] < 0:
+            raise CommandError('--processes must be 0 (every CPU) or more')
+        if options['range_mb'] < 1:
+            raise CommandError('--range-mb must be at least 1')
+
+        write = bulk_insert
+        if options['sync']:
+            write = sync_batch
+            if options['copy']:
+                self.stdout.write(
+                    self.style.WARNING('--copy cannot upsert and is ignored with --sync')
+                )
+            if workers > 1:
+                # Concurrent writers could each insert the same new URL
+                self.stdout.write(
+                    self.style.WARNING('--sync writes with a single connection; --workers is ignored')
+                )
+                workers = 1
+        elif options['copy']:
+            if supports_copy():
+                write = copy_insert
             else:
-                recipes_list = recipes_data
-
-            for recipe_data in recipes_list:
-                # Extract and clean data
-                title = recipe_data.get('title')
-                if title:
-                    title = title.strip()
-
-                if not title:
-                    skipped_count += 1
-                    continue
-
-                # Handle NaN values by converting to None
-                def clean_numeric(value):
-                    if value is None or (isinstance(value, float) and math.isnan(value)):
-                        return None
-                    try:
-                        return float(value) if isinstance(value, (int, float, str)) else None
-                    except (ValueError, TypeError):
-                        return None
-
-                def clean_int(value):
-                    if value is None or (isinstance(value, float) and math.isnan(value)):
-                        return None
-                    try:
-                        return int(float(value)) if isinstance(value, (int, float, str)) else None
-                    except (ValueError, TypeError):
-                        return None
-
-                # Create recipe object
-                recipe = Recipe(
-                    title=title,
-                    cuisine=recipe_data.get('cuisine'),
-                    rating=clean_numeric(recipe_data.get('rating')),
-                    prep_time=clean_int(recipe_data.get('prep_time')),
-                    cook_time=clean_int(recipe_data.get('cook_time')),
-                    total_time=clean_int(recipe_data.get('total_time')),
-                    description=recipe_data.get('description'),
-                    serves=recipe_data.get('serves'),
-                    nutrients=recipe_data.get('nutrients'),
-                    continent=recipe_data.get('Contient'),  # Note: typo in original JSON
-                    country_state=recipe_data.get('Country_State'),
-                    url=recipe_data.get('URL'),
-                    ingredients=recipe_data.get('ingredients'),
-                    instructions=recipe_data.get('instructions'),
+                self.stdout.write(
+                    self.style.WARNING('COPY is only available on PostgreSQL, falling back to bulk INSERT')
                 )
 
-                recipe.save()
-                created_count += 1
+        self.stdout.write(self.style.SUCCESS(f'Loading recipes from {json_file}...'))
 
-                if created_count % 100 == 0:
-                    self.stdout.write(f'Loaded {created_count} recipes...')
+        # Clear existing recipes (optional - comment out if you want to keep existing data)
+        # Recipe.objects.all().delete()
+        # self.stdout.write(self.style.WARNING('Cleared existing recipes'))
 
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully loaded {created_count} recipes. Skipped {skipped_count} invalid entries.'
-                )
-            )
+        started = time.perf_counter()
+        if options['dead_letter'] and not options['resume']:
+            open(options['dead_letter'], 'w').close()
+        report = LoadReport(options['dead_letter'])
 
-        except FileNotFoundError:
-            self.stdout.write(
-                self.style.ERROR(f'File not found: {json_file}')
+        try:
+            # Also with one process, so every load is checkpointed and resumable
+            counts = parallel_load(
+                json_file,
+                write,
+                processes=options['processes'] or None,
+                writers=workers,
+                batch_size=batch_size,
+                range_bytes=options['range_mb'] * 2 ** 20,
+                resume=options['resume'],
+                progress=lambda writer: self.stdout.write(f'Loaded {writer.written} recipes...'),
+                report=report,
             )
+        except FileNotFoundError:
+            raise CommandError(f'File not found: {json_file}')
         except json.JSONDecodeError as e:
-            self.stdout.write(
-                self.style.ERROR(f'Invalid JSON file: {e}')
-            )
+            self.write_interrupted(report)
+            raise CommandError(f'Invalid JSON file: {e}') from e
         except Exception as e:
+            self.write_interrupted(report)
+            raise CommandError(f'Error loading recipes: {e}') from e
+        finally:
+            report.close()
+            if report.written['created'] or report.written['updated']:
+                # Bulk writes send no model signals, so invalidate cached API
+                # responses here, also after a partial load.
+                self.bump_catalog_version()
+
+        elapsed = time.perf_counter() - started
+        # Read from the primary; a replica may not have caught up yet
+        buckets = refresh_facet_rollup(Recipe.objects.using(DEFAULT_DB_ALIAS), get_catalog_version())
+        processed = counts['read'] - counts['resumed']
+        rate = processed / elapsed if elapsed > 0 else 0.0
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully loaded {counts["created"]} recipes. Rejected {report.rejected} invalid entries.'
+            )
+        )
+        if counts['resumed']:
+            self.stdout.write(f'Resumed: {counts["resumed"]} records were already loaded by the interrupted run')
+        if options['sync']:
             self.stdout.write(
-                self.style.ERROR(f'Error loading recipes: {e}')
+                f'Sync: {counts["updated"]} updated, {counts["unchanged"]} unchanged, '
+                f'{counts["duplicate"]} duplicates in input'
             )
+        self.stdout.write(
+            f'Read {counts["read"]} records in {elapsed:.2f}s ({rate:.0f} rows/sec, '
+            f'batch size {batch_size}, {workers} worker(s), {write.__name__})'
+        )
+        self.write_report(report)
+        self.stdout.write(f'Indexed {counts["ingredient_links"]} recipe ingredients')
+        self.stdout.write(f'Refreshed facet rollup ({buckets} buckets)')
+
+        if options['report']:
+            summary = dict(
+                report.summary(),
+                input=json_file,
+                read=counts['read'],
+                resumed=counts['resumed'],
+                elapsed=round(elapsed, 3),
+            )
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+                f.write('\n')
+
+    def bump_catalog_version(self):
+        """
+        Errors here are reported but not raised, so they cannot hide the
+        error that stopped a load.
+        """
+        try:
+            bump_catalog_version()
+        except Exception as e:
+            self.stderr.write(self.style.WARNING(f'Could not invalidate cached API responses: {e}'))
+
+    def write_report(self, report):
+        if report.rejected:
+            errors = ', '.join(f'{error} {count}' for error, count in report.errors.most_common())
+            self.stdout.write(self.style.WARNING(f'Rejected by error: {errors}'))
+            if report.dead_letter:
+                self.stdout.write(f'Rejected records written to {report.dead_letter}')
+        seconds = ', '.join(f'{stage} {value:.2f}s' for stage, value in report.seconds.items())
+        self.stdout.write(f'Stage time: {seconds}')
+
+    def write_interrupted(self, report):
+        """
+        What a failed load left behind: its batches are committed one by one.
+        """
+        self.stdout.write(
+            f'{report.written["created"] + report.written["updated"]} recipes were committed before the error'
+        )
+        self.write_report(report)
+        self.stdout.write('Committed batches are checkpointed; rerun with --resume to load the rest')
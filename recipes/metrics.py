@@ -0,0 +1,218 @@
+"""
+Per-request instrumentation and per-endpoint metrics.
+
+MetricsMiddleware opens a RequestStats for every request. A database
+execute wrapper adds each query's count and time to it, and views add
+serialization time through timer(). When the request finishes, the stats
+are folded into the process-wide `registry`, which /metrics renders in
+the Prometheus text format. Everything is kept in memory per process;
+updating it costs a few counter increments under a lock.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Length at which SQL is cut off in the slow-query log
+MAX_LOGGED_SQL = 2000
+
+
+class RequestStats:
+    """
+    Counters for one request.
+    """
+    __slots__ = ('started', 'db_queries', 'db_time', 'serialize_time', 'slow_query_seconds', 'slow_queries')
+
+    def __init__(self, slow_query_seconds=None):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_queries = []
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+_current = contextvars.ContextVar('recipes_request_stats', default=None)
+
+
+def start_request(slow_query_seconds=None):
+    """
+    Begin collecting stats for the current request (thread or task).
+    Returns the stats and a token for end_request().
+    """
+    stats = RequestStats(slow_query_seconds)
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timer(attribute='serialize_time'):
+    """
+    Add the time spent in the block to the current request's stats.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, attribute, getattr(stats, attribute) + time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting and timing queries of the current request.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.db_queries += 1
+        stats.db_time += elapsed
+        if stats.slow_query_seconds is not None and elapsed >= stats.slow_query_seconds:
+            stats.slow_queries.append((elapsed, sql[:MAX_LOGGED_SQL]))
+
+
+def _install_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorder():
+    """
+    Attach record_query to open connections and to every new one.
+    """
+    connection_created.connect(_install_wrapper, dispatch_uid='recipes.metrics.record_query')
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(connection)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class EndpointMetrics:
+    __slots__ = ('buckets', 'count', 'duration', 'statuses', 'db_queries', 'db_time', 'serialize_time', 'response_bytes')
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * bucket_count
+        self.count = 0
+        self.duration = 0.0
+        self.statuses = {}
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics keyed by (endpoint, method).
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bucket_bounds = tuple(buckets)
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, duration, stats, response_bytes=None):
+        bucket = bisect.bisect_left(self.bucket_bounds, duration)
+        with self.lock:
+            metrics = self.endpoints.get((endpoint, method))
+            if metrics is None:
+                metrics = self.endpoints[(endpoint, method)] = EndpointMetrics(len(self.bucket_bounds))
+            if bucket < len(metrics.buckets):
+                metrics.buckets[bucket] += 1
+            metrics.count += 1
+            metrics.duration += duration
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.db_queries += stats.db_queries
+            metrics.db_time += stats.db_time
+            metrics.serialize_time += stats.serialize_time
+            if response_bytes is not None:
+                metrics.response_bytes += response_bytes
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            snapshot = [
+                (key, list(m.buckets), m.count, m.duration, dict(m.statuses), m.db_queries, m.db_time,
+                 m.serialize_time, m.response_bytes)
+                for key, m in endpoints
+            ]
+
+        lines = [
+            '# HELP recipes_http_request_duration_seconds Request latency by endpoint.',
+            '# TYPE recipes_http_request_duration_seconds histogram',
+        ]
+        for (endpoint, method), buckets, count, duration, *_ in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.bucket_bounds, buckets):
+                cumulative += bucket_count
+                lines.append(
+                    f'recipes_http_request_duration_seconds_bucket'
+                    f'{_labels(endpoint=endpoint, method=method, le=repr(bound))} {cumulative}'
+                )
+            labels = _labels(endpoint=endpoint, method=method)
+            lines.append(
+                f'recipes_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, method=method, le="+Inf")} {count}'
+            )
+            lines.append(f'recipes_http_request_duration_seconds_sum{labels} {duration!r}')
+            lines.append(f'recipes_http_request_duration_seconds_count{labels} {count}')
+
+        lines += [
+            '# HELP recipes_http_requests_total Requests by endpoint and status code.',
+            '# TYPE recipes_http_requests_total counter',
+        ]
+        for (endpoint, method), _, _, _, statuses, *_ in snapshot:
+            for status, status_count in sorted(statuses.items()):
+                lines.append(
+                    f'recipes_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {status_count}'
+                )
+
+        totals = (
+            ('recipes_db_queries_total', 'counter', 'Database queries executed while handling requests.', 5),
+            ('recipes_db_query_seconds_total', 'counter', 'Time spent in database queries.', 6),
+            ('recipes_serialization_seconds_total', 'counter', 'Time spent serializing response data.', 7),
+            ('recipes_response_bytes_total', 'counter', 'Response body bytes (streamed responses excluded).', 8),
+        )
+        for name, kind, help_text, index in totals:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for row in snapshot:
+                (endpoint, method) = row[0]
+                lines.append(f'{name}{_labels(endpoint=endpoint, method=method)} {row[index]!r}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,168 @@
+"""
+Request instrumentation, and wrappers that skip browser-oriented
+middleware for API requests.
+
+The /api/ endpoints are anonymous, cookie-less reads, so sessions, CSRF,
+authentication and messages only add per-request work there. Each wrapper
+here behaves exactly like the Django middleware it wraps, except that
+requests under API_PATH_PREFIX go straight to the next handler. The admin
+and anything else outside the prefix keep the full stack.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+
+API_PATH_PREFIX = '/api/'
+
+slow_logger = logging.getLogger('recipes.slow')
+
+
+class MetricsMiddleware:
+    """
+    Record latency, database queries, serialization time and response size
+    per endpoint (URL name), add a Server-Timing header and log slow
+    requests and queries with their query string to `recipes.slow`.
+
+    Place it first in MIDDLEWARE so the timings cover the whole stack.
+    Disabled with RECIPES_METRICS = False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RECIPES_METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request = self._seconds(getattr(settings, 'RECIPES_SLOW_REQUEST_MS', None))
+        self.slow_query = self._seconds(getattr(settings, 'RECIPES_SLOW_QUERY_MS', None))
+        metrics.install_query_recorder()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _seconds(milliseconds):
+        return None if milliseconds is None or milliseconds < 0 else milliseconds / 1000
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = metrics.start_request(self.slow_query)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self.finish(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request(self.slow_query)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self.finish(request, response, stats)
+        return response
+
+    def endpoint(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.url_name or match.route
+
+    def finish(self, request, response, stats):
+        duration = stats.elapsed
+        endpoint = self.endpoint(request)
+        size = None if response.streaming else len(response.content)
+        metrics.registry.observe(endpoint, request.method, response.status_code, duration, stats, size)
+
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_queries} queries", '
+            f'serialize;dur={stats.serialize_time * 1000:.2f}, '
+            f'total;dur={duration * 1000:.2f}'
+        )
+
+        slow = self.slow_request is not None and duration >= self.slow_request
+        if slow or stats.slow_queries:
+            slow_logger.warning(
+                'Slow %s %s (%s) %.1f ms, %d queries in %.1f ms, params: %s',
+                request.method, request.path, endpoint, duration * 1000, stats.db_queries,
+                stats.db_time * 1000, request.GET.urlencode() or '-',
+            )
+            for elapsed, sql in stats.slow_queries:
+                slow_logger.warning('Slow query (%s) %.1f ms: %s', endpoint, elapsed * 1000, sql)
+
+
+class APIBypassMiddleware:
+    """
+    Base class; `wrapped_class` is the middleware to skip for API requests.
+    """
+    sync_capable = True
+    async_capable = True
+    wrapped_class = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.middleware = self.wrapped_class(get_response)
+        self.prefix = getattr(settings, 'API_PATH_PREFIX', API_PATH_PREFIX)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def bypass(self, request):
+        return request.path_info.startswith(self.prefix)
+
+    def __call__(self, request):
+        # Both handlers return an awaitable when the chain is async
+        if self.bypass(request):
+            return self.get_response(request)
+        return self.middleware(request)
+
+
+def _process_view(self, request, view_func, view_args, view_kwargs):
+    if self.bypass(request):
+        return None
+    return self.middleware.process_view(request, view_func, view_args, view_kwargs)
+
+
+def _process_exception(self, request, exception):
+    if self.bypass(request):
+        return None
+    return self.middleware.process_exception(request, exception)
+
+
+def _process_template_response(self, request, response):
+    if self.bypass(request):
+        return response
+    return self.middleware.process_template_response(request, response)
+
+
+def skip_for_api(path):
+    """
+    Build an APIBypassMiddleware subclass wrapping the middleware at `path`.
+    It also subclasses the wrapped class, so system checks that look for
+    e.g. AuthenticationMiddleware still pass. Only the hooks the wrapped
+    middleware defines are exposed, since Django decides which hooks to call
+    by their presence.
+    """
+    wrapped_class = import_string(path)
+    attrs = {'wrapped_class': wrapped_class, '__module__': __name__}
+    hooks = {
+        'process_view': _process_view,
+        'process_exception': _process_exception,
+        'process_template_response': _process_template_response,
+    }
+    for name, hook in hooks.items():
+        if hasattr(wrapped_class, name):
+            attrs[name] = hook
+    return type(wrapped_class.__name__, (APIBypassMiddleware, wrapped_class), attrs)
+
+
+SessionMiddleware = skip_for_api('django.contrib.sessions.middleware.SessionMiddleware')
+CsrfViewMiddleware = skip_for_api('django.middleware.csrf.CsrfViewMiddleware')
+AuthenticationMiddleware = skip_for_api('django.contrib.auth.middleware.AuthenticationMiddleware')
+MessageMiddleware = skip_for_api('django.contrib.messages.middleware.MessageMiddleware')
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_recipe_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="calories_kcal",
+            field=models.FloatField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="carbohydrates_g",
+            field=models.FloatField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="fat_g",
+            field=models.FloatField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="protein_g",
+            field=models.FloatField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+    ]
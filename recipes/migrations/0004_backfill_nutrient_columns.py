@@ -0,0 +1,56 @@
+import re
+
+from django.db import migrations
+
+
+BATCH_SIZE = 2000
+
+# Frozen copies of recipes.models.NUTRIENT_COLUMNS and parse_nutrient_value,
+# so later changes to the app code do not change this migration.
+NUTRIENT_COLUMNS = {
+    "calories_kcal": "calories",
+    "protein_g": "proteinContent",
+    "carbohydrates_g": "carbohydrateContent",
+    "fat_g": "fatContent",
+}
+
+NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_nutrient_value(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return None if value != value else float(value)
+    if not isinstance(value, str):
+        return None
+    match = NUMBER_RE.search(value)
+    return float(match.group()) if match else None
+
+
+def backfill_nutrient_columns(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    db_alias = schema_editor.connection.alias
+    columns = list(NUTRIENT_COLUMNS)
+
+    batch = []
+    queryset = Recipe.objects.using(db_alias).exclude(nutrients=None).only("id", "nutrients")
+    for recipe in queryset.iterator(chunk_size=BATCH_SIZE):
+        nutrients = recipe.nutrients if isinstance(recipe.nutrients, dict) else {}
+        for column, key in NUTRIENT_COLUMNS.items():
+            setattr(recipe, column, parse_nutrient_value(nutrients.get(key)))
+        batch.append(recipe)
+        if len(batch) >= BATCH_SIZE:
+            Recipe.objects.using(db_alias).bulk_update(batch, columns)
+            batch = []
+    if batch:
+        Recipe.objects.using(db_alias).bulk_update(batch, columns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_recipe_nutrient_columns"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_nutrient_columns, migrations.RunPython.noop),
+    ]
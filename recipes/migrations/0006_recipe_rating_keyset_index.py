@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:00
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                models.OrderBy(
+                    django.db.models.functions.comparison.Coalesce(
+                        "rating", models.Value(-1.0)
+                    ),
+                    descending=True,
+                ),
+                models.F("title"),
+                models.F("id"),
+                name="recipes_rating_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_catalogstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FacetCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("facet", models.CharField(max_length=50)),
+                ("position", models.IntegerField()),
+                ("value", models.CharField(blank=True, max_length=255, null=True)),
+                ("lower", models.FloatField(blank=True, null=True)),
+                ("upper", models.FloatField(blank=True, null=True)),
+                ("count", models.IntegerField()),
+            ],
+            options={
+                "ordering": ["facet", "position"],
+            },
+        ),
+        migrations.AddField(
+            model_name="catalogstate",
+            name="facets_version",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="facetcount",
+            constraint=models.UniqueConstraint(
+                fields=("facet", "position"), name="recipes_facetcount_position_uniq"
+            ),
+        ),
+    ]
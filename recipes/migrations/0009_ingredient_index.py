@@ -0,0 +1,215 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:27
+
+import re
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 2000
+
+# Frozen copy of the name normalization in recipes.ingredients, so later
+# changes to it do not change what this migration writes.
+
+# Leading words of an ingredient line that are not part of its name
+LEADING_WORDS = frozenset("""
+    a an of about approximately heaping level scant
+    cup cups c tablespoon tablespoons tbsp tbs tbl teaspoon teaspoons tsp
+    pound pounds lb lbs ounce ounces oz fluid fl gram grams g kilogram kilograms kg
+    milliliter milliliters ml liter liters l quart quarts qt pint pints pt gallon gallons
+    can cans package packages pkg jar jars bottle bottles container containers box boxes
+    bag bags bunch bunches head heads stalk stalks sprig sprigs slice slices piece pieces
+    clove cloves pinch pinches dash dashes drop drops stick sticks envelope envelopes
+    sheet sheets packet packets inch inches x
+    large small medium whole
+""".split())
+
+# Preparation words; a comma-separated part made only of these (and
+# leading words) is not the name, as in "skinless, boneless chicken breasts"
+PREPARATION_WORDS = frozenset("""
+    skinless boneless peeled unpeeled seeded pitted cored trimmed chopped diced minced
+    sliced grated shredded crushed cubed halved quartered fresh frozen thawed cooked
+    uncooked softened melted divided drained rinsed packed sifted beaten room temperature
+    finely coarsely roughly thinly lightly or
+""".split())
+
+# Words ignored when matching names and query terms
+STOP_WORDS = frozenset(
+    "and or of for to the a an with into plus as needed taste optional".split()
+)
+
+MAX_NAME_LENGTH = 255
+
+_PARENTHETICAL = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+
+def stem(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(text):
+    if not isinstance(text, str):
+        return None
+    text = _PARENTHETICAL.sub(" ", text.lower())
+    # The name is the first comma-separated part that is more than
+    # quantities and preparation words; notes follow: "onion, finely chopped"
+    for part in text.split(","):
+        words = _WORD.findall(part)
+        while words and words[0] in LEADING_WORDS:
+            words.pop(0)
+        if any(word not in PREPARATION_WORDS for word in words):
+            return " ".join(words)[:MAX_NAME_LENGTH].strip()
+    return None
+
+
+def ingredient_tokens(text):
+    return sorted(
+        {stem(word) for word in _WORD.findall(text.lower()) if word not in STOP_WORDS}
+    )
+
+
+def ingredient_names(ingredients):
+    if not isinstance(ingredients, list):
+        return []
+    names = []
+    for line in ingredients:
+        name = normalize_ingredient(line)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill_ingredient_index(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    db_alias = schema_editor.connection.alias
+
+    ids = {}
+
+    def write(batch):
+        missing = sorted({name for _, names in batch for name in names} - ids.keys())
+        Ingredient.objects.using(db_alias).bulk_create(
+            [Ingredient(name=name, tokens=ingredient_tokens(name)) for name in missing]
+        )
+        ids.update(
+            Ingredient.objects.using(db_alias)
+            .filter(name__in=missing)
+            .values_list("name", "id")
+        )
+        RecipeIngredient.objects.using(db_alias).bulk_create(
+            [
+                RecipeIngredient(recipe_id=pk, ingredient_id=ids[name])
+                for pk, names in batch
+                for name in names
+            ],
+            batch_size=5000,
+        )
+
+    batch = []
+    queryset = (
+        Recipe.objects.using(db_alias)
+        .exclude(ingredients=None)
+        .order_by("id")
+        .only("id", "ingredients")
+    )
+    for recipe in queryset.iterator(chunk_size=BATCH_SIZE):
+        batch.append((recipe.pk, ingredient_names(recipe.ingredients)))
+        if len(batch) >= BATCH_SIZE:
+            write(batch)
+            batch = []
+    if batch:
+        write(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_facet_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Ingredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                (
+                    "tokens",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=255), size=None
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="RecipeIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recipe_links",
+                        to="recipes.ingredient",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ingredient_links",
+                        to="recipes.recipe",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["tokens"], name="recipes_ingredient_tokens_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipeingredient",
+            index=models.Index(
+                fields=["ingredient", "recipe"], name="recipes_ingredient_recipe_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="recipeingredient",
+            constraint=models.UniqueConstraint(
+                fields=("recipe", "ingredient"), name="recipes_recipeingredient_uniq"
+            ),
+        ),
+        migrations.RunPython(backfill_ingredient_index, migrations.RunPython.noop),
+    ]
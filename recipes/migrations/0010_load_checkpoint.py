@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_ingredient_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LoadCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("run", models.CharField(max_length=64)),
+                ("batch", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="loadcheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("run", "batch"), name="recipes_loadcheckpoint_uniq"
+            ),
+        ),
+    ]
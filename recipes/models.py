@@ -1,5 +1,44 @@
+import re
 from django.db import models
-from django.contrib.postgres.fields import JSONField
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Upper
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+
+
+# Denormalized numeric column -> key in the `nutrients` JSON
+NUTRIENT_COLUMNS = {
+    'calories_kcal': 'calories',
+    'protein_g': 'proteinContent',
+    'carbohydrates_g': 'carbohydrateContent',
+    'fat_g': 'fatContent',
+}
+
+# Below any real rating, so unrated recipes sort last in (rating DESC) order
+UNRATED_SORT_VALUE = -1.0
+
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def parse_nutrient_value(value):
+    """
+    Extract the numeric part of a nutrient string such as '389 kcal' or '21 g'.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return None if value != value else float(value)
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER_RE.search(value)
+    return float(match.group()) if match else None
+
+
+def rating_sort_key():
+    """
+    Non-null rating expression used for keyset pagination.
+    Must stay identical to the expression in Recipe.Meta.indexes.
+    """
+    return Coalesce('rating', Value(UNRATED_SORT_VALUE))
 
 
 class Recipe(models.Model):
@@ -19,6 +58,12 @@ class Recipe(models.Model):
     # JSON field for nutrients (using JSONB in PostgreSQL)
     nutrients = models.JSONField(null=True, blank=True)
 
+    # Numeric copies of the main nutrients so they can be filtered with indexes
+    calories_kcal = models.FloatField(db_index=True, null=True, blank=True, editable=False)
+    protein_g = models.FloatField(db_index=True, null=True, blank=True, editable=False)
+    carbohydrates_g = models.FloatField(db_index=True, null=True, blank=True, editable=False)
+    fat_g = models.FloatField(db_index=True, null=True, blank=True, editable=False)
+
     # Additional fields from original JSON (not required by spec but useful)
     continent = models.CharField(max_length=255, null=True, blank=True)
     country_state = models.CharField(max_length=255, null=True, blank=True)
@@ -26,6 +71,12 @@ class Recipe(models.Model):
     ingredients = models.JSONField(null=True, blank=True)
     instructions = models.JSONField(null=True, blank=True)
 
+    # SHA-256 of the source fields, used by load_recipes --sync to skip unchanged rows
+    content_hash = models.CharField(max_length=64, db_index=True, null=True, blank=True, editable=False)
+
+    # Weighted tsvector over title/cuisine/description, maintained by a database trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -36,7 +87,124 @@ class Recipe(models.Model):
             models.Index(fields=['-rating']),
             models.Index(fields=['cuisine']),
             models.Index(fields=['total_time']),
+            models.Index(fields=['url']),
+            # Keyset pagination order: (rating DESC NULLS LAST, title, id)
+            models.Index(rating_sort_key().desc(), 'title', 'id', name='recipes_rating_keyset_idx'),
+            # icontains compiles to UPPER(col) LIKE UPPER(...), so the trigram
+            # indexes are built on the same expression.
+            GinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='recipes_title_trgm_idx'),
+            GinIndex(OpClass(Upper('cuisine'), name='gin_trgm_ops'), name='recipes_cuisine_trgm_idx'),
+            GinIndex(fields=['search_vector'], name='recipes_search_vector_idx'),
         ]
 
     def __str__(self):
         return self.title
+
+    def fill_nutrient_columns(self):
+        """
+        Copy the numeric nutrient values out of the `nutrients` JSON.
+        """
+        nutrients = self.nutrients if isinstance(self.nutrients, dict) else {}
+        for column, key in NUTRIENT_COLUMNS.items():
+            setattr(self, column, parse_nutrient_value(nutrients.get(key)))
+
+    def save(self, *args, **kwargs):
+        self.fill_nutrient_columns()
+        super().save(*args, **kwargs)
+
+
+class CatalogState(models.Model):
+    """
+    Single-row table holding the catalog version.
+    Bumped whenever recipes change so caches keyed on it are invalidated.
+    """
+    version = models.BigIntegerField(default=0)
+    # Catalog version the FacetCount rollup was computed at
+    facets_version = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Catalog version {self.version}'
+
+
+class FacetCount(models.Model):
+    """
+    Precomputed facet bucket over the whole catalog.
+    Term facets fill `value`, range facets fill `lower`/`upper`.
+    Rebuilt by recipes.facets.refresh_facet_rollup().
+    """
+    facet = models.CharField(max_length=50)
+    position = models.IntegerField()
+    value = models.CharField(max_length=255, null=True, blank=True)
+    lower = models.FloatField(null=True, blank=True)
+    upper = models.FloatField(null=True, blank=True)
+    count = models.IntegerField()
+
+    class Meta:
+        ordering = ['facet', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'position'], name='recipes_facetcount_position_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.facet}: {self.value if self.value is not None else self.lower} ({self.count})'
+
+
+class Ingredient(models.Model):
+    """
+    Normalized ingredient name, e.g. "cream cheese", with its stemmed
+    tokens for matching. Built by recipes.ingredients.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    tokens = ArrayField(models.CharField(max_length=255))
+
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            GinIndex(fields=['tokens'], name='recipes_ingredient_tokens_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeIngredient(models.Model):
+    """
+    Recipe to normalized ingredient link.
+    """
+    # Covered by the unique constraint (recipe, ingredient) and the
+    # (ingredient, recipe) index, so no single-column indexes
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredient_links', db_index=False)
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, related_name='recipe_links', db_index=False
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'ingredient'], name='recipes_recipeingredient_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['ingredient', 'recipe'], name='recipes_ingredient_recipe_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.ingredient_id}'
+
+
+class LoadCheckpoint(models.Model):
+    """
+    Batch committed by a resumable load (see recipes.ingest). Written in
+    the same transaction as the batch, so it is recorded if and only if
+    the batch's recipes are.
+    """
+    run = models.CharField(max_length=64)
+    batch = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'batch'], name='recipes_loadcheckpoint_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.run}: {self.batch}'
@@ -0,0 +1,212 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+
+from .cache import cached_count
+from .models import rating_sort_key
+
+
+def estimate_row_count(queryset):
+    """
+    Planner estimate of the table size from pg_class.reltuples.
+    Returns None when unavailable (other databases, never-analyzed tables).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def count_queryset(queryset, strategy):
+    """
+    Count a queryset with the given strategy.
+    Returns (count, strategy actually used); `estimated` only applies to
+    unfiltered querysets and otherwise falls back to `cached`.
+    """
+    if strategy == 'estimated' and not queryset.query.where:
+        estimate = estimate_row_count(queryset)
+        if estimate is not None:
+            return estimate, 'estimated'
+    if strategy in ('cached', 'estimated'):
+        return cached_count(queryset), 'cached'
+    return queryset.count(), 'exact'
+
+
+class RecipePaginator(Paginator):
+    """
+    Paginator whose count follows settings.RECIPES_COUNT_STRATEGY.
+    `count_strategy` records the strategy actually used.
+    """
+    count_strategy = None
+
+    @cached_property
+    def count(self):
+        strategy = getattr(settings, 'RECIPES_COUNT_STRATEGY', 'exact')
+        count, self.count_strategy = count_queryset(self.object_list, strategy)
+        return count
+
+    def is_estimate(self):
+        self.count  # resolves count_strategy
+        return self.count_strategy == 'estimated'
+
+    def validate_number(self, number):
+        if not self.is_estimate():
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if not self.is_estimate():
+            return super().page(number)
+        # An estimate may fall short of the real size, so pages are not
+        # clamped to it; a page past the end is simply empty.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class RecipePagination(PageNumberPagination):
+    """
+    Custom pagination class for recipes.
+    """
+    django_paginator_class = RecipePaginator
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class RecipeSearchPagination(RecipePagination):
+    """
+    Bounded pagination for search results.
+
+    Only the first `max_results` matches are reachable, which also bounds the
+    COUNT used for `total`. Pass total=false to skip counting altogether;
+    `has_next` is then worked out by fetching one extra row.
+    """
+    max_results = 1000
+    total_query_param = 'total'
+
+    def include_total(self, request):
+        value = request.query_params.get(self.total_query_param, 'true')
+        return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message)
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message)
+
+        start = min((self.page_number - 1) * self.limit, self.max_results)
+        stop = min(start + self.limit, self.max_results)
+        rows = list(queryset[start:stop + 1]) if stop > start else []
+        self.has_next = len(rows) > stop - start and stop < self.max_results
+        rows = rows[:stop - start]
+
+        self.total = None
+        if self.include_total(request):
+            self.total = queryset[:self.max_results].count()
+        return rows
+
+    def get_paginated_response(self, data):
+        response = {
+            'page': self.page_number,
+            'limit': self.limit,
+        }
+        if self.total is not None:
+            response['total'] = self.total
+        response['has_next'] = self.has_next
+        response['data'] = data
+        return Response(response)
+
+
+class RecipeCursorPagination(BasePagination):
+    """
+    Keyset pagination over (rating DESC, title, id).
+
+    Each page continues strictly after the last row of the previous one, so
+    there is no OFFSET to scan past and no COUNT(*). NULL ratings sort last
+    through rating_sort_key(), which the composite index in Recipe.Meta is
+    built on. The continuation token is opaque to clients.
+    """
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size < 1:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, row):
+        # Rows are model instances or .values() dicts
+        if isinstance(row, dict):
+            position = [row['rating_key'], row['title'], row['id']]
+        else:
+            position = [row.rating_key, row.title, row.pk]
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            rating_key, title, pk = json.loads(raw)
+            return float(rating_key), str(title), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_page_size(request)
+        queryset = queryset.annotate(rating_key=rating_sort_key()).order_by('-rating_key', 'title', 'id')
+
+        token = request.query_params.get(self.cursor_query_param, '').strip()
+        if token:
+            rating_key, title, pk = self.decode_cursor(token)
+            # The leading range condition lets the index scan start at the
+            # cursor; the rest breaks ties within equal ratings.
+            queryset = queryset.filter(rating_key__lte=rating_key).filter(
+                Q(rating_key__lt=rating_key)
+                | Q(title__gt=title)
+                | Q(title=title, id__gt=pk)
+            )
+
+        rows = list(queryset[:self.limit + 1])
+        self.next_cursor = self.encode_cursor(rows[self.limit - 1]) if len(rows) > self.limit else None
+        return rows[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'limit': self.limit,
+            'next_cursor': self.next_cursor,
+            'data': data,
+        })
@@ -0,0 +1,27 @@
+"""
+Faster JSON rendering for the API.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Output is compact UTF-8 like DRF's default JSONRenderer. Types orjson
+    does not know natively (lazy translation strings, Decimal, ...) go
+    through DRF's JSONEncoder. Without orjson, or for requests asking for
+    indented output, it falls back to the stock renderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=JSONEncoder().default)
@@ -0,0 +1,44 @@
+"""
+Database router sending recipe reads to read replicas.
+"""
+import random
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import replicas_may_lag
+
+
+class ReadReplicaRouter:
+    """
+    Route reads of catalog models to a random `replica_*` database.
+
+    Writes, migrations and all other models use `default`. Reads made while
+    `default` is inside a transaction stay on it, so a transaction sees its
+    own writes. CatalogState is read from the primary because replica lag
+    could otherwise make a process cache responses under a stale version.
+    For the same reason recipe reads also stay on the primary for
+    RECIPES_REPLICA_LAG seconds after each catalog change.
+    """
+    replica_models = ('recipe', 'facetcount', 'ingredient', 'recipeingredient')
+
+    def replicas(self):
+        return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'recipes' or model._meta.model_name not in self.replica_models:
+            return None
+        if connections['default'].in_atomic_block or replicas_may_lag():
+            return 'default'
+        replicas = self.replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
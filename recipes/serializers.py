@@ -1,8 +1,27 @@
-from rest_framework import serializers
+import datetime
+import functools
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Recipe
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that takes an optional `fields` argument restricting
+    which of its fields are output.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(DynamicFieldsModelSerializer):
     """
     Serializer for Recipe model.
     """
@@ -28,3 +47,139 @@ class RecipeSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class RecipeSummarySerializer(RecipeSerializer):
+    """
+    Compact serializer used by default for list and search results.
+    """
+    class Meta(RecipeSerializer.Meta):
+        fields = [
+            'id',
+            'title',
+            'cuisine',
+            'rating',
+            'total_time',
+        ]
+
+
+def parse_field_list(params, name):
+    value = params.get(name, None)
+    if value is None:
+        return None
+    return [field.strip() for field in value.split(',') if field.strip()]
+
+
+def parse_selected_fields(params):
+    """
+    Resolve ?fields= / ?exclude= into a list of RecipeSerializer field names.
+    Returns None when neither parameter was given.
+    """
+    fields = parse_field_list(params, 'fields')
+    exclude = parse_field_list(params, 'exclude')
+    available = RecipeSerializer.Meta.fields
+
+    unknown = [name for name in (fields or []) + (exclude or []) if name not in available]
+    if unknown:
+        raise serializers.ValidationError({'fields': f'Unknown field(s): {", ".join(unknown)}'})
+
+    if fields is None and exclude is None:
+        return None
+    return [
+        name for name in available
+        if (fields is None or name in fields) and name not in (exclude or [])
+    ]
+
+
+def fetch_columns(serializer_class, fields, always_fetch=()):
+    """
+    Database columns needed to serialize `fields` (or the serializer's own
+    fields when None), plus the ordering/pagination keys.
+    """
+    if fields is None:
+        fields = serializer_class.Meta.fields
+    return set(fields) | set(always_fetch)
+
+
+def _identity(value):
+    return value
+
+
+def _datetime_converter(field, tz):
+    """
+    DateTimeField.to_representation specialised for ISO 8601 output in a
+    timezone resolved once per page rather than once per value.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if tz is None or hasattr(field, 'timezone') or output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, datetime.datetime) and value.utcoffset() is not None:
+            value = value.astimezone(tz).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return field.to_representation(value)
+    return convert
+
+
+def _field_converter(field, tz):
+    """
+    Pick the cheapest callable that matches `field.to_representation`.
+    Types without a known shortcut fall back to the field's own method.
+    """
+    if isinstance(field, serializers.JSONField) and not field.binary:
+        return _identity
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.FloatField):
+        return float
+    if type(field) in (serializers.CharField, serializers.URLField):
+        return str
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field, tz)
+    return field.to_representation
+
+
+class FastRecipeSerializer:
+    """
+    Read-only serializer for `.values()` rows.
+
+    Produces the same output as the DRF serializer it was compiled from, but
+    resolves the per-field conversion once per page instead of walking the
+    field machinery for every row. Use `compile()` to get a cached instance.
+    """
+    def __init__(self, serializer):
+        self.fields = list(serializer.fields.items())
+
+    @property
+    def sources(self):
+        return [field.source for _, field in self.fields]
+
+    @classmethod
+    def compile(cls, serializer_class, fields=None):
+        return _compile_serializer(cls, serializer_class, tuple(fields) if fields is not None else None)
+
+    def get_columns(self):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [(name, field.source, _field_converter(field, tz)) for name, field in self.fields]
+
+    def to_representation(self, row, columns=None):
+        result = {}
+        for name, source, convert in columns or self.get_columns():
+            value = row[source]
+            result[name] = None if value is None else convert(value)
+        return result
+
+    def serialize(self, rows):
+        columns = self.get_columns()
+        return [self.to_representation(row, columns) for row in rows]
+
+
+# Field subsets come from the client, so only the most recent ones are kept
+COMPILED_SERIALIZERS_CACHE_SIZE = 64
+
+
+@functools.lru_cache(maxsize=COMPILED_SERIALIZERS_CACHE_SIZE)
+def _compile_serializer(cls, serializer_class, fields):
+    kwargs = {'fields': fields} if fields is not None else {}
+    return cls(serializer_class(**kwargs))
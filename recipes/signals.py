@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .ingredients import index_ingredients
+from .models import Recipe
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, using='default', **kwargs):
+    """
+    Keep the ingredient index of a saved recipe current. Connected before
+    recipe_changed so the index is updated before the version bump.
+    """
+    if not raw:
+        index_ingredients([instance], using=using, replace=True)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, **kwargs):
+    """
+    Invalidate cached catalog data when a recipe is saved or deleted
+    (admin edits, shell, etc.). Bulk loads bump the version themselves.
+    """
+    bump_catalog_version()
@@ -0,0 +1,340 @@
+"""
+Precomputed "more like this" index (requires NumPy).
+
+`build_similarity` turns every recipe into a fixed-size float32 vector:
+title, cuisine and ingredient tokens are hashed into buckets and weighted
+by TF-IDF, nutrient and time values are added as clipped z-scores, and
+each part is normalized and weighted before the whole vector is
+L2-normalized, so a dot product is a cosine similarity. The exact top-K
+neighbours of every recipe are then computed in chunks of matrix products.
+
+Everything is stored as .npy files in one build directory and opened with
+mmap, so processes share the pages and only touch the rows they serve:
+
+    ids.npy         recipe ids, in row order (int64)
+    positions.npy   recipe id -> row, -1 when absent (int32, dense)
+    vectors.npy     feature vectors (float32, rows x dim)
+    neighbors.npy   rows of the top-K neighbours (int32, rows x K)
+    scores.npy      their cosine similarities (float32, rows x K)
+
+`current.json` in the index directory names the active build and is
+replaced atomically, so a rebuild never disturbs running processes. The
+build it replaced is kept until the next rebuild.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from array import array
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .ingredients import ingredient_names, ingredient_tokens
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_DIM = 256
+DEFAULT_K = 20
+
+NUMERIC_FEATURES = ('calories_kcal', 'protein_g', 'carbohydrates_g', 'fat_g', 'total_time')
+
+# Relative weight of each feature group in the final vector
+WEIGHTS = {
+    'title': 1.0,
+    'cuisine': 0.6,
+    'ingredients': 1.2,
+    'numeric': 0.5,
+}
+
+# Upper bound on the similarity matrix computed at once (float32 cells)
+MAX_CHUNK_CELLS = 2 ** 25
+
+POINTER_FILE = 'current.json'
+
+
+class SimilarityUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The similarity index has not been built. Run `manage.py build_similarity`.'
+    default_code = 'similarity_unavailable'
+
+
+def is_available():
+    return np is not None
+
+
+def index_dir():
+    return Path(getattr(settings, 'RECIPES_SIMILARITY_DIR', Path(settings.BASE_DIR) / 'similarity_index'))
+
+
+def _bucket(feature, buckets):
+    # crc32 is stable across processes, unlike hash()
+    value = zlib.crc32(feature.encode('utf-8'))
+    return value % buckets, 1 if value & 0x80000000 else -1
+
+
+def recipe_tokens(title, cuisine, ingredients):
+    """
+    Token lists of the hashed feature groups of one recipe.
+    """
+    ingredient_features = []
+    for name in ingredient_names(ingredients):
+        ingredient_features.append(name)
+        ingredient_features.extend(ingredient_tokens(name))
+    return {
+        'title': ingredient_tokens(title or ''),
+        'cuisine': [cuisine.lower()] if cuisine else [],
+        'ingredients': ingredient_features,
+    }
+
+
+def _tfidf_block(rows, cols, signs, count, buckets):
+    """
+    Signed TF-IDF values of one hashed feature group, L2-normalized per row.
+    Returns unique (row, col) pairs and their values.
+    """
+    keys = rows.astype(np.int64) * buckets + cols
+    unique, inverse = np.unique(keys, return_inverse=True)
+    values = np.bincount(inverse, weights=signs).astype(np.float32)
+    rows, cols = unique // buckets, unique % buckets
+    df = np.bincount(cols, minlength=buckets)
+    idf = np.log((1.0 + count) / (1.0 + df)) + 1.0
+    values *= idf[cols].astype(np.float32)
+    norms = np.sqrt(np.bincount(rows, weights=values.astype(np.float64) ** 2, minlength=count))
+    values /= np.where(norms > 0, norms, 1.0)[rows].astype(np.float32)
+    return rows, cols, values
+
+
+def build_vectors(rows, dim=DEFAULT_DIM):
+    """
+    Feature vectors for (id, title, cuisine, ingredients, *NUMERIC_FEATURES)
+    rows. Returns (ids, vectors) with vectors L2-normalized float32.
+    """
+    buckets = dim - len(NUMERIC_FEATURES)
+    if buckets < 1:
+        raise ValueError(f'dim must be larger than {len(NUMERIC_FEATURES)}')
+
+    ids, numeric = [], []
+    # Compact typed buffers; a large catalog has tens of millions of tokens
+    entries = {group: (array('i'), array('i'), array('b')) for group in ('title', 'cuisine', 'ingredients')}
+    for position, (pk, title, cuisine, ingredients, *values) in enumerate(rows):
+        ids.append(pk)
+        numeric.append([np.nan if value is None else value for value in values])
+        for group, tokens in recipe_tokens(title, cuisine, ingredients).items():
+            group_rows, group_cols, group_signs = entries[group]
+            for token in tokens:
+                col, sign = _bucket(f'{group}:{token}', buckets)
+                group_rows.append(position)
+                group_cols.append(col)
+                group_signs.append(sign)
+
+    count = len(ids)
+    vectors = np.zeros((count, dim), dtype=np.float32)
+    for group, (group_rows, group_cols, group_signs) in entries.items():
+        if not group_rows:
+            continue
+        block_rows, block_cols, values = _tfidf_block(
+            np.frombuffer(group_rows, dtype=np.int32),
+            np.frombuffer(group_cols, dtype=np.int32),
+            np.frombuffer(group_signs, dtype=np.int8).astype(np.float64),
+            count,
+            buckets,
+        )
+        # Pairs are unique within a group, so plain fancy-index addition is safe
+        vectors[block_rows, block_cols] += values * WEIGHTS[group]
+
+    if count:
+        numeric = np.asarray(numeric, dtype=np.float64)
+        # Missing values become the column mean (z = 0); columns without
+        # any value stay all zero
+        present = ~np.isnan(numeric)
+        counts = np.maximum(present.sum(axis=0), 1)
+        filled = np.where(present, numeric, 0.0)
+        mean = filled.sum(axis=0) / counts
+        std = np.sqrt((np.where(present, numeric - mean, 0.0) ** 2).sum(axis=0) / counts)
+        z = np.where(present, (filled - mean) / np.where(std > 0, std, 1.0), 0.0)
+        z = np.clip(z, -3.0, 3.0) / 3.0
+        scale = WEIGHTS['numeric'] / np.sqrt(len(NUMERIC_FEATURES))
+        vectors[:, buckets:] = (z * scale).astype(np.float32)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1.0)
+    return np.asarray(ids, dtype=np.int64), vectors
+
+
+def top_k_neighbors(vectors, k=DEFAULT_K, chunk_size=None):
+    """
+    Exact top-k rows by cosine similarity for every row (excluding itself),
+    best first. Returns (neighbors int32, scores float32), both rows x k.
+    """
+    count = len(vectors)
+    k = max(0, min(k, count - 1))
+    neighbors = np.zeros((count, k), dtype=np.int32)
+    scores = np.zeros((count, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+
+    chunk_size = chunk_size or max(1, min(4096, MAX_CHUNK_CELLS // count))
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        similarities = vectors[start:stop] @ vectors.T
+        similarities[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        # Unordered top k per row in O(rows), then sort just those
+        candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        neighbors[start:stop] = np.take_along_axis(candidates, order, axis=1)
+        scores[start:stop] = np.take_along_axis(candidate_scores, order, axis=1)
+    return neighbors, scores
+
+
+def build_index(queryset, directory=None, dim=DEFAULT_DIM, k=DEFAULT_K, chunk_size=None, catalog_version=None):
+    """
+    Build the index for `queryset` into a new build directory and make it
+    current. Returns a dict of build statistics.
+    """
+    if np is None:
+        raise SimilarityUnavailable('NumPy is required for the similarity index.')
+    directory = Path(directory or index_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    rows = queryset.order_by('id').values_list('id', 'title', 'cuisine', 'ingredients', *NUMERIC_FEATURES)
+    ids, vectors = build_vectors(rows.iterator(chunk_size=2000), dim)
+    features_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    neighbors, scores = top_k_neighbors(vectors, k, chunk_size)
+    neighbors_seconds = time.perf_counter() - started
+
+    positions = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int32)
+    positions[ids] = np.arange(len(ids), dtype=np.int32)
+
+    name = f'build-{time.strftime("%Y%m%d%H%M%S")}-{os.getpid()}'
+    # Written under a temporary name, so pruning never sees a partial build
+    staging = directory / f'tmp-{name}'
+    staging.mkdir()
+    arrays = {'ids': ids, 'positions': positions, 'vectors': vectors, 'neighbors': neighbors, 'scores': scores}
+    for array_name, values in arrays.items():
+        np.save(staging / f'{array_name}.npy', values)
+    meta = {
+        'build': name,
+        'count': len(ids),
+        'dim': dim,
+        'k': neighbors.shape[1],
+        'weights': WEIGHTS,
+        'catalog_version': catalog_version,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+    (staging / 'meta.json').write_text(json.dumps(meta, indent=2))
+    os.replace(staging, directory / name)
+
+    pointer = directory / POINTER_FILE
+    try:
+        previous = json.loads(pointer.read_text())['build']
+    except FileNotFoundError:
+        previous = None
+    temporary = directory / f'{POINTER_FILE}.{os.getpid()}'
+    temporary.write_text(json.dumps({'build': name}))
+    os.replace(temporary, pointer)
+
+    # The previous build stays for processes that read the old pointer but
+    # have not opened it yet; only builds older than it are removed.
+    # Processes still holding those keep their open mappings.
+    if previous is not None:
+        for old in directory.glob('build-*'):
+            if old.name < previous and old.name != name:
+                shutil.rmtree(old, ignore_errors=True)
+
+    return dict(
+        meta,
+        features_seconds=round(features_seconds, 3),
+        neighbors_seconds=round(neighbors_seconds, 3),
+        bytes=sum(values.nbytes for values in arrays.values()),
+    )
+
+
+class SimilarityIndex:
+    """
+    A built index opened read-only with mmap.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / 'meta.json').read_text())
+        self.ids = np.load(self.path / 'ids.npy', mmap_mode='r')
+        self.positions = np.load(self.path / 'positions.npy', mmap_mode='r')
+        self.neighbors = np.load(self.path / 'neighbors.npy', mmap_mode='r')
+        self.scores = np.load(self.path / 'scores.npy', mmap_mode='r')
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    def __contains__(self, recipe_id):
+        return 0 <= recipe_id < len(self.positions) and self.positions[recipe_id] >= 0
+
+    def similar(self, recipe_id, limit=None):
+        """
+        [(recipe id, score), ...] of the nearest recipes, best first, or
+        None when the recipe is not in the index.
+        """
+        if recipe_id not in self:
+            return None
+        row = int(self.positions[recipe_id])
+        limit = self.k if limit is None else min(limit, self.k)
+        neighbor_ids = self.ids[self.neighbors[row, :limit]].tolist()
+        return list(zip(neighbor_ids, self.scores[row, :limit].tolist()))
+
+
+_index = None
+_index_key = None
+_index_lock = threading.Lock()
+
+
+def _open_current(pointer):
+    """
+    (pointer key, index) of the build `pointer` names. A rebuild can swap
+    the pointer and prune that build before it is opened, so a missing
+    build is retried once with the new pointer.
+    """
+    for attempt in range(2):
+        try:
+            stat = pointer.stat()
+            build = json.loads(pointer.read_text())['build']
+            return (stat.st_mtime_ns, stat.st_size, stat.st_ino), SimilarityIndex(pointer.parent / build)
+        except FileNotFoundError:
+            if attempt:
+                raise SimilarityUnavailable()
+
+
+def get_similarity_index():
+    """
+    The current index of this process, reopened when a rebuild replaced it.
+    Raises SimilarityUnavailable when there is none.
+    """
+    global _index, _index_key
+    if np is None:
+        raise SimilarityUnavailable('NumPy is required for the similarity index.')
+    pointer = index_dir() / POINTER_FILE
+    try:
+        stat = pointer.stat()
+    except FileNotFoundError:
+        raise SimilarityUnavailable()
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    if _index is not None and _index_key == key:
+        return _index
+    with _index_lock:
+        if _index is None or _index_key != key:
+            _index_key, _index = _open_current(pointer)
+        return _index
@@ -0,0 +1,216 @@
+"""
+Optional in-process columnar snapshot of the catalog for search.
+
+With RECIPES_SNAPSHOT enabled and NumPy installed, each process keeps the
+filterable Recipe columns in NumPy arrays, stored in the search endpoint's
+default (-rating, title) order as sorted by the database. Numeric and
+cuisine/continent filters are evaluated as vectorized masks, so the
+matching ids of a page come out already ordered and only that page's rows
+are read from the database. Requests using filters the snapshot does not
+hold (title, q, sort) go through SQL as usual.
+
+The snapshot is rebuilt on the first search after the catalog version
+changes. While one thread rebuilds it, others fall back to SQL.
+"""
+import threading
+
+from django.conf import settings
+from django_filters.constants import EMPTY_VALUES
+
+from .cache import get_catalog_version
+from .filters import OperatorFilter, RecipeFilter
+from .models import Recipe
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Columns stored as float64 (NULL -> NaN, which fails every comparison like NULL does in SQL)
+FLOAT_COLUMNS = ('rating', 'calories_kcal', 'protein_g', 'carbohydrates_g', 'fat_g')
+# Whole-minute columns; float32 holds them exactly and keeps NaN for NULL
+TIME_COLUMNS = ('total_time', 'prep_time', 'cook_time')
+CODE_COLUMNS = ('cuisine', 'continent')
+
+SNAPSHOT_ORDERING = ('-rating', 'title', 'id')
+
+
+def is_enabled():
+    return np is not None and getattr(settings, 'RECIPES_SNAPSHOT', False)
+
+
+class CatalogSnapshot:
+    """
+    Filterable columns of every recipe as NumPy arrays in SNAPSHOT_ORDERING.
+    Text columns are stored as integer codes into a per-column vocabulary,
+    with -1 for NULL.
+    """
+    comparisons = {
+        'lt': 'less',
+        'lte': 'less_equal',
+        'gt': 'greater',
+        'gte': 'greater_equal',
+        'exact': 'equal',
+    }
+
+    def __init__(self, version, ids, columns, vocabularies):
+        self.version = version
+        self.ids = ids
+        self.columns = columns
+        self.vocabularies = vocabularies
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + sum(column.nbytes for column in self.columns.values())
+
+    @classmethod
+    def build(cls, version, using=None):
+        names = FLOAT_COLUMNS + TIME_COLUMNS + CODE_COLUMNS
+        values = {name: [] for name in ('id',) + names}
+        vocabularies = {name: {} for name in CODE_COLUMNS}
+        nan = float('nan')
+
+        rows = Recipe.objects.using(using).order_by(*SNAPSHOT_ORDERING).values_list('id', *names)
+        for row in rows.iterator(chunk_size=10000):
+            values['id'].append(row[0])
+            for name, value in zip(names, row[1:]):
+                if name in vocabularies:
+                    value = -1 if value is None else vocabularies[name].setdefault(value, len(vocabularies[name]))
+                elif value is None:
+                    value = nan
+                values[name].append(value)
+
+        columns = {}
+        for name in FLOAT_COLUMNS:
+            columns[name] = np.array(values[name], dtype=np.float64)
+        for name in TIME_COLUMNS:
+            columns[name] = np.array(values[name], dtype=np.float32)
+        for name in CODE_COLUMNS:
+            columns[name] = np.array(values[name], dtype=np.int32)
+        return cls(
+            version,
+            np.array(values['id'], dtype=np.int64),
+            columns,
+            {name: list(vocabulary) for name, vocabulary in vocabularies.items()},
+        )
+
+    def codes(self, column, predicate):
+        return [code for code, label in enumerate(self.vocabularies[column]) if predicate(label)]
+
+    def match(self, bounds=(), contains=None, members=None):
+        """
+        Ids of matching recipes, in SNAPSHOT_ORDERING.
+
+        bounds: (column, lookup, number) comparisons, all of which must hold
+        contains: {column: substring} case-insensitive matches
+        members: {column: [values]} exact matches
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        for column, lookup, number in bounds:
+            mask &= getattr(np, self.comparisons[lookup])(self.columns[column], number)
+        for column, needle in (contains or {}).items():
+            needle = needle.upper()
+            mask &= np.isin(self.columns[column], self.codes(column, lambda label: needle in label.upper()))
+        for column, wanted in (members or {}).items():
+            wanted = set(wanted)
+            mask &= np.isin(self.columns[column], self.codes(column, lambda label: label in wanted))
+        return self.ids[mask]
+
+
+class SnapshotResult:
+    """
+    Sliceable, countable stand-in for a queryset over snapshot matches.
+    Iterating it fetches the rows for its ids from `queryset`, keeping the
+    snapshot order.
+    """
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('SnapshotResult only supports slicing')
+        return SnapshotResult(self.ids[key], self.queryset)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        ids = self.ids.tolist()
+        if not ids:
+            return iter([])
+        rows = {row['id']: row for row in self.queryset.filter(pk__in=ids)}
+        # Rows deleted since the snapshot was built are skipped
+        return iter([rows[pk] for pk in ids if pk in rows])
+
+
+_snapshot = None
+_rebuild_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Snapshot for the current catalog version, rebuilding it if needed.
+    Returns None while another thread is rebuilding.
+    """
+    global _snapshot
+    version = get_catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    if not _rebuild_lock.acquire(blocking=False):
+        return None
+    try:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = CatalogSnapshot.build(version)
+        return _snapshot
+    finally:
+        _rebuild_lock.release()
+
+
+def snapshot_search(params, queryset, filterset=None):
+    """
+    Answer a search from the snapshot. `queryset` supplies the rows (with
+    the wanted .values() columns) for the ids of the requested page.
+    Pass an already built RecipeFilter as `filterset` to avoid parsing
+    `params` again. Returns None when the snapshot is disabled,
+    unavailable, or cannot evaluate the given filters.
+    """
+    if not is_enabled():
+        return None
+    if filterset is None:
+        filterset = RecipeFilter(params)
+    if not filterset.is_valid():
+        # Let the SQL path report the errors
+        return None
+
+    bounds, contains, members = [], {}, {}
+    for name, value in filterset.form.cleaned_data.items():
+        if value in EMPTY_VALUES:
+            continue
+        field = filterset.filters[name]
+        if isinstance(field, OperatorFilter):
+            if field.field_name not in FLOAT_COLUMNS + TIME_COLUMNS:
+                return None
+            bounds.extend((field.field_name, lookup, number) for lookup, number in value)
+        elif name == 'cuisine':
+            contains['cuisine'] = value
+        elif name in ('cuisine_in', 'continent_in'):
+            members[field.field_name] = value
+        elif name == 'ingredient_match':
+            # Only qualifies `ingredient`, which falls through to SQL
+            continue
+        else:
+            return None
+
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    return SnapshotResult(snapshot.match(bounds, contains, members), queryset)
@@ -0,0 +1,185 @@
+"""
+In-process prefix index for search-box suggestions.
+
+Every distinct title and cuisine is one suggestion, ranked by its best
+recipe rating (then by how many recipes share it). A suggestion is
+reachable from the start of each of its words, so "bre" suggests
+"Spinach Bread": the index holds one sorted key per word suffix
+("spinach bread", "bread"), and a prefix query is a bisect for the
+contiguous range of keys starting with it.
+
+Answering from a large range would mean scanning it, so the best ranks
+of every prefix matching more than HEAVY_RANGE keys are precomputed when
+the index is built. Either way a lookup touches at most HEAVY_RANGE keys
+and never the database.
+
+The index is rebuilt on the first request after the catalog version
+changes. While one thread rebuilds it, others keep serving the old one.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+from .cache import get_catalog_version
+from .models import Recipe
+
+
+SUGGEST_KINDS = ('title', 'cuisine')
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+
+# Prefixes matching more keys than this get their top ranks precomputed
+HEAVY_RANGE = 256
+MAX_QUERY_LENGTH = 100
+
+# Sorts after every character, so prefix + _END bounds all keys with that prefix
+_END = '\U0010ffff'
+_WORD = re.compile(r'[^\W_]+')
+
+
+def normalize_text(text):
+    """
+    Lowercase, accent-free words of `text` joined by single spaces.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_WORD.findall(text))
+
+
+class PrefixIndex:
+    """
+    Ranked suggestions of one kind and the sorted word-suffix keys that
+    lead to them. `ranks[i]` is the suggestion of `keys[i]`; suggestions
+    are stored best first, so a smaller rank is a better match.
+    """
+    def __init__(self, suggestions, keys, ranks, tops):
+        self.suggestions = suggestions
+        self.keys = keys
+        self.ranks = ranks
+        self.tops = tops
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    @classmethod
+    def build(cls, entries):
+        """
+        Index from {normalized text: (display text, rating, recipe count)}.
+        """
+        ordered = sorted(entries.items(), key=lambda item: (-(item[1][1] or 0.0), -item[1][2], item[0]))
+        suggestions = [
+            {'text': text, 'rating': rating, 'recipes': count}
+            for _, (text, rating, count) in ordered
+        ]
+        pairs = []
+        for rank, (normalized, _) in enumerate(ordered):
+            words = normalized.split(' ')
+            for start in range(len(words)):
+                pairs.append((' '.join(words[start:]), rank))
+        pairs.sort()
+        keys = [key for key, _ in pairs]
+        ranks = [rank for _, rank in pairs]
+        index = cls(suggestions, keys, ranks, {})
+        if keys:
+            index.collect_tops(0, 0, len(keys))
+        return index
+
+    def collect_tops(self, depth, lo, hi):
+        """
+        Best SUGGEST_MAX_LIMIT distinct ranks of keys[lo:hi], which share their
+        first `depth` characters. Stores them in `tops` for every prefix
+        whose range is larger than HEAVY_RANGE.
+        """
+        if hi - lo <= HEAVY_RANGE:
+            return sorted(set(self.ranks[lo:hi]))[:SUGGEST_MAX_LIMIT]
+        keys = self.keys
+        candidates = []
+        position = lo
+        # Keys equal to the prefix itself sort first
+        while position < hi and len(keys[position]) == depth:
+            candidates.append(self.ranks[position])
+            position += 1
+        while position < hi:
+            prefix = keys[position][:depth + 1]
+            end = bisect_right(keys, prefix + _END, position, hi)
+            candidates.extend(self.collect_tops(depth + 1, position, end))
+            position = end
+        top = sorted(set(candidates))[:SUGGEST_MAX_LIMIT]
+        if depth:
+            self.tops[keys[lo][:depth]] = top
+        return top
+
+    def complete(self, prefix, limit=SUGGEST_DEFAULT_LIMIT):
+        """
+        Best `limit` suggestions with a word starting with the normalized
+        `prefix`.
+        """
+        if not prefix:
+            return []
+        top = self.tops.get(prefix)
+        if top is None:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_right(self.keys, prefix + _END, lo)
+            top = sorted(set(self.ranks[lo:hi]))
+        return [self.suggestions[rank] for rank in top[:limit]]
+
+
+class SuggestIndex:
+    """
+    Title and cuisine prefix indexes for one catalog version.
+    """
+    def __init__(self, version, indexes):
+        self.version = version
+        self.indexes = indexes
+
+    @classmethod
+    def build(cls, version, using=None):
+        entries = {kind: {} for kind in SUGGEST_KINDS}
+        rows = Recipe.objects.using(using).order_by().values_list(*SUGGEST_KINDS, 'rating')
+        for row in rows.iterator(chunk_size=10000):
+            rating = row[-1]
+            for kind, text in zip(SUGGEST_KINDS, row):
+                if not text or not text.strip():
+                    continue
+                normalized = normalize_text(text)
+                if not normalized:
+                    continue
+                entry = entries[kind].get(normalized)
+                if entry is None:
+                    entries[kind][normalized] = (text.strip(), rating, 1)
+                    continue
+                display, best, count = entry
+                if rating is not None and (best is None or rating > best):
+                    best = rating
+                entries[kind][normalized] = (display, best, count + 1)
+        return cls(version, {kind: PrefixIndex.build(entries[kind]) for kind in SUGGEST_KINDS})
+
+    def suggest(self, query, kinds=SUGGEST_KINDS, limit=SUGGEST_DEFAULT_LIMIT):
+        prefix = normalize_text(query[:MAX_QUERY_LENGTH])
+        return {kind: self.indexes[kind].complete(prefix, limit) for kind in kinds}
+
+
+_index = None
+_rebuild_lock = threading.Lock()
+
+
+def get_suggest_index():
+    """
+    Suggest index for the current catalog version. While another thread
+    rebuilds it, the previous index is returned; only the very first build
+    is waited for.
+    """
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    if not _rebuild_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _index is None or _index.version != version:
+            _index = SuggestIndex.build(version)
+        return _index
+    finally:
+        _rebuild_lock.release()
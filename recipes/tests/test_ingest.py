@@ -0,0 +1,245 @@
+"""
+Tests of the parallel, resumable loader (recipes.ingest).
+
+The resume tests commit through writer threads, so they need a real
+PostgreSQL test database: python manage.py test recipes
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from recipes.ingest import clean_task, iter_jsonl_range, parallel_load, plan_tasks, run_key
+from recipes.loader import bulk_insert
+from recipes.models import LoadCheckpoint, Recipe
+from recipes.validation import InvalidJSON
+
+
+def make_records(count, prefix='Recipe'):
+    return [
+        {
+            'title': f'{prefix} {number}',
+            'cuisine': ['Italian', 'Mexican', 'Thai'][number % 3],
+            'rating': number % 5,
+            'ingredients': [f'{number % 7 + 1} cups flour', 'salt'],
+            'URL': f'https://example.com/{prefix.lower()}/{number}',
+        }
+        for number in range(count)
+    ]
+
+
+def write_json(path, records):
+    path.write_text(json.dumps(records), encoding='utf-8')
+
+
+def write_jsonl(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records), encoding='utf-8')
+
+
+class CrashingWrite:
+    """
+    bulk_insert that fails on its `fail_at`-th batch, as a crash would.
+    It keeps bulk_insert's name, which is part of the run key.
+    """
+    def __init__(self, fail_at):
+        self.fail_at = fail_at
+        self.calls = 0
+        self.__name__ = bulk_insert.__name__
+
+    def __call__(self, recipes, using='default'):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise RuntimeError('simulated crash')
+        return bulk_insert(recipes, using=using)
+
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.root = Path(temporary.name)
+
+
+class JsonlRangeTests(TempDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        lines = [
+            b'{"title": "a"}\n',
+            b'\n',
+            b'{"title": "bb"}\r\n',
+            b'{"title": "ccc", "cuisine": "Thai"}\n',
+            b'not json\n',
+            b'   \n',
+            b'{"title": "d"}\n',
+            b'{"title": "last line without a newline"}',
+        ]
+        self.path = self.root / 'lines.jsonl'
+        self.path.write_bytes(b''.join(lines))
+        self.size = self.path.stat().st_size
+        self.expected = []
+        offset = 0
+        for line in lines:
+            if line.strip():
+                self.expected.append(offset)
+            offset += len(line)
+
+    def read_ranges(self, range_bytes):
+        items = []
+        for start in range(0, self.size, range_bytes):
+            items.extend(iter_jsonl_range(self.path, start, min(start + range_bytes, self.size)))
+        return items
+
+    def test_every_line_belongs_to_exactly_one_range(self):
+        # Every range size puts edges at every byte, including line starts,
+        # the middle of lines and the last byte of a line
+        for range_bytes in range(1, self.size + 2):
+            with self.subTest(range_bytes=range_bytes):
+                offsets = [offset for offset, _ in self.read_ranges(range_bytes)]
+                self.assertEqual(offsets, self.expected)
+
+    def test_range_starting_on_a_line_owns_it(self):
+        start = self.expected[2]
+        offset, record = next(iter_jsonl_range(self.path, start, self.size))
+        self.assertEqual((offset, record['title']), (start, 'ccc'))
+
+    def test_records_and_invalid_lines(self):
+        items = self.read_ranges(7)
+        self.assertEqual(items[1][1], {'title': 'bb'})
+        self.assertIsInstance(items[3][1], InvalidJSON)
+        self.assertEqual(items[3][1].text, 'not json')
+        self.assertEqual(items[-1][1]['title'], 'last line without a newline')
+
+
+class BatchKeyTests(TempDirMixin, SimpleTestCase):
+    batch_size = 10
+    range_bytes = 2000
+
+    def setUp(self):
+        super().setUp()
+        self.input = self.root / 'shards'
+        self.input.mkdir()
+        # Up to range_bytes: parsed whole by a worker
+        write_json(self.input / 'a.json', make_records(8, 'Small'))
+        # Larger: parsed while planning and sent out as record tasks
+        write_json(self.input / 'b.json', make_records(60, 'Large'))
+        write_jsonl(self.input / 'c.jsonl', make_records(80, 'Lines'))
+
+    def batch_keys(self, path):
+        files = sorted(Path(path).iterdir())
+        keys = []
+        for task in plan_tasks(files, Path(path), self.batch_size, self.range_bytes):
+            batches, _, _, _ = clean_task(task, self.batch_size)
+            keys.extend((key, [recipe.title for recipe in recipes]) for key, recipes in batches)
+        return keys
+
+    def test_batch_keys_are_stable_across_runs(self):
+        first = self.batch_keys(self.input)
+        self.assertEqual(first, self.batch_keys(self.input))
+        kinds = {task[0] for task in plan_tasks(sorted(self.input.iterdir()), self.input, 10, self.range_bytes)}
+        self.assertEqual(kinds, {'json', 'records', 'jsonl'})
+        self.assertEqual(len({key for key, _ in first}), len(first))
+
+    def test_batch_keys_do_not_depend_on_the_working_directory(self):
+        first = self.batch_keys(self.input)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(self.root)
+        self.assertEqual(first, self.batch_keys(Path('shards')))
+
+    def test_run_key(self):
+        files = sorted(self.input.iterdir())
+        key = run_key(files, 'bulk_insert', self.batch_size, self.range_bytes)
+        self.assertEqual(key, run_key(files, 'bulk_insert', self.batch_size, self.range_bytes))
+        self.assertNotEqual(key, run_key(files, 'copy_insert', self.batch_size, self.range_bytes))
+        self.assertNotEqual(key, run_key(files, 'bulk_insert', self.batch_size + 1, self.range_bytes))
+        stat = files[0].stat()
+        os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertNotEqual(key, run_key(files, 'bulk_insert', self.batch_size, self.range_bytes))
+
+
+class ResumeTests(TempDirMixin, TransactionTestCase):
+    batch_size = 25
+    range_bytes = 4000
+
+    def load(self, path, write=bulk_insert, **kwargs):
+        return parallel_load(
+            path, write, processes=1, batch_size=self.batch_size, range_bytes=self.range_bytes, **kwargs
+        )
+
+    def crash_and_resume(self, path, count, **kwargs):
+        with self.assertRaisesMessage(RuntimeError, 'simulated crash'):
+            self.load(path, CrashingWrite(fail_at=4), **kwargs)
+        committed = Recipe.objects.count()
+        self.assertGreater(committed, 0)
+        self.assertLess(committed, count)
+        self.assertTrue(LoadCheckpoint.objects.exists())
+
+        counts = self.load(path, resume=True, **kwargs)
+        self.assertEqual(Recipe.objects.count(), count)
+        self.assertEqual(Recipe.objects.values('title').distinct().count(), count)
+        self.assertEqual(counts['read'], count)
+        self.assertEqual(counts['resumed'], committed)
+        self.assertEqual(counts['created'], count - committed)
+        self.assertFalse(LoadCheckpoint.objects.exists())
+
+    def test_resume_json(self):
+        path = self.root / 'recipes.json'
+        write_json(path, make_records(200))
+        self.crash_and_resume(path, 200)
+
+    def test_resume_large_json(self):
+        # Parsed in the main process and sent out as record tasks
+        path = self.root / 'recipes.json'
+        write_json(path, make_records(200))
+        self.range_bytes = 1000
+        self.crash_and_resume(path, 200)
+
+    def test_resume_jsonl_ranges(self):
+        path = self.root / 'recipes.jsonl'
+        write_jsonl(path, make_records(300))
+        self.crash_and_resume(path, 300)
+
+    def test_resume_directory_with_writer_threads(self):
+        write_json(self.root / 'a.json', make_records(100, 'First'))
+        write_jsonl(self.root / 'b.jsonl', make_records(150, 'Second'))
+        self.crash_and_resume(self.root, 250, writers=2)
+
+    def test_checkpoints_removed_after_success(self):
+        path = self.root / 'recipes.jsonl'
+        write_jsonl(path, make_records(120))
+        counts = self.load(path)
+        self.assertEqual(counts['created'], 120)
+        self.assertFalse(LoadCheckpoint.objects.exists())
+
+    def test_load_without_resume_discards_checkpoints(self):
+        path = self.root / 'recipes.json'
+        write_json(path, make_records(100))
+        with self.assertRaisesMessage(RuntimeError, 'simulated crash'):
+            self.load(path, CrashingWrite(fail_at=2))
+        self.assertTrue(LoadCheckpoint.objects.exists())
+        counts = self.load(path)
+        self.assertEqual(counts['resumed'], 0)
+        self.assertEqual(counts['created'], 100)
+        self.assertFalse(LoadCheckpoint.objects.exists())
+
+    def test_default_command_is_resumable(self):
+        path = self.root / 'recipes.json'
+        write_json(path, make_records(200))
+        options = ['--batch-size', str(self.batch_size)]
+        with mock.patch('recipes.management.commands.load_recipes.bulk_insert', CrashingWrite(fail_at=4)):
+            with self.assertRaisesMessage(CommandError, 'simulated crash'):
+                call_command('load_recipes', str(path), *options, stdout=StringIO())
+        self.assertEqual(Recipe.objects.count(), 3 * self.batch_size)
+
+        output = StringIO()
+        call_command('load_recipes', str(path), *options, '--resume', stdout=output)
+        self.assertIn(f'Resumed: {3 * self.batch_size} records', output.getvalue())
+        self.assertEqual(Recipe.objects.values('title').distinct().count(), 200)
+        self.assertEqual(Recipe.objects.count(), 200)
+        self.assertFalse(LoadCheckpoint.objects.exists())
@@ -1,7 +1,25 @@
 from django.urls import path
-from .views import RecipeListView, RecipeSearchView
+from .async_views import RecipeListStreamView, RecipeSearchStreamView
+from .views import (
+    RecipeBatchSearchView,
+    RecipeDetailView,
+    RecipeExportView,
+    RecipeFacetsView,
+    RecipeListView,
+    RecipeSearchView,
+    RecipeSimilarView,
+    RecipeSuggestView,
+)
 
 urlpatterns = [
     path('recipes', RecipeListView.as_view(), name='recipe-list'),
+    path('recipes/<int:pk>', RecipeDetailView.as_view(), name='recipe-detail'),
+    path('recipes/<int:pk>/similar', RecipeSimilarView.as_view(), name='recipe-similar'),
     path('recipes/search', RecipeSearchView.as_view(), name='recipe-search'),
+    path('recipes/search/batch', RecipeBatchSearchView.as_view(), name='recipe-search-batch'),
+    path('recipes/suggest', RecipeSuggestView.as_view(), name='recipe-suggest'),
+    path('recipes/facets', RecipeFacetsView.as_view(), name='recipe-facets'),
+    path('recipes/export', RecipeExportView.as_view(), name='recipe-export'),
+    path('recipes/stream', RecipeListStreamView.as_view(), name='recipe-list-stream'),
+    path('recipes/search/stream', RecipeSearchStreamView.as_view(), name='recipe-search-stream'),
 ]
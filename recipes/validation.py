@@ -0,0 +1,252 @@
+"""
+Per-record validation, dead-letter output and the load report of
+load_recipes.
+
+Every raw record goes through validate_record() before build_recipe()
+cleans it. Records that fail are not loaded; they are counted by error
+and, with a dead-letter file, written to it as one JSON object per line:
+
+    {"file": "n.json", "position": 17, "stage": "validate",
+     "error": "missing_title", "message": "...", "record": {...}}
+
+`position` is the record's index in a JSON document or the byte offset of
+its line in a JSONL file. A batch the database refuses (a constraint or
+data error) is retried one recipe at a time, so only the offending rows
+are diverted, with stage "write". Connection and programming errors still
+stop the load.
+
+LoadReport collects the rejections, the rows written and the time spent
+in the parse, clean and write stages.
+"""
+import json
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import DataError, IntegrityError
+
+from .loader import CONTENT_FIELDS, build_recipe, clean_numeric
+from .models import Recipe
+
+
+STAGES = ('parse', 'clean', 'write')
+
+# Raw key -> model field, for the scalar text fields
+TEXT_KEYS = {
+    'title': 'title',
+    'cuisine': 'cuisine',
+    'description': 'description',
+    'serves': 'serves',
+    'Contient': 'continent',
+    'Country_State': 'country_state',
+    'URL': 'url',
+}
+NUMERIC_KEYS = ('rating', 'prep_time', 'cook_time', 'total_time')
+LIST_KEYS = ('ingredients', 'instructions')
+OBJECT_KEYS = ('nutrients',)
+
+MAX_LENGTHS = {
+    key: Recipe._meta.get_field(name).max_length
+    for key, name in TEXT_KEYS.items()
+    if Recipe._meta.get_field(name).max_length
+}
+
+
+class RecordError(ValueError):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class InvalidJSON:
+    """
+    Stands in for a JSONL line that could not be decoded.
+    """
+    def __init__(self, text, message):
+        self.text = text
+        self.message = message
+
+
+def validate_record(recipe_data):
+    """
+    Raise RecordError when a raw record cannot be loaded as it is.
+    Values that clean to NULL (None, '', a NaN number) are accepted.
+    """
+    if isinstance(recipe_data, InvalidJSON):
+        raise RecordError('invalid_json', recipe_data.message)
+    if not isinstance(recipe_data, dict):
+        raise RecordError('not_an_object', f'Expected a JSON object, got {type(recipe_data).__name__}')
+
+    for key in TEXT_KEYS:
+        value = recipe_data.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise RecordError('invalid_type', f'{key} must be a string, got {type(value).__name__}')
+        if key in MAX_LENGTHS and len(str(value).strip()) > MAX_LENGTHS[key]:
+            raise RecordError('too_long', f'{key} is longer than {MAX_LENGTHS[key]} characters')
+        if isinstance(value, str) and '\x00' in value:
+            # PostgreSQL text cannot hold NUL
+            raise RecordError('invalid_text', f'{key} contains a NUL character')
+    title = recipe_data.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise RecordError('missing_title', 'title is missing or blank')
+
+    for key in NUMERIC_KEYS:
+        value = recipe_data.get(key)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        number = clean_numeric(value)
+        if number is None and isinstance(value, float):
+            continue  # NaN
+        # Anything else non-finite, including strings like 'NaN' and 'inf'
+        if number is None or not math.isfinite(number):
+            raise RecordError('invalid_number', f'{key} is not a number: {value!r}')
+    for key in LIST_KEYS:
+        if recipe_data.get(key) is not None and not isinstance(recipe_data[key], list):
+            raise RecordError('invalid_type', f'{key} must be a list, got {type(recipe_data[key]).__name__}')
+    for key in OBJECT_KEYS:
+        if recipe_data.get(key) is not None and not isinstance(recipe_data[key], dict):
+            raise RecordError('invalid_type', f'{key} must be an object, got {type(recipe_data[key]).__name__}')
+
+
+def rejection(file, position, stage, error, message, record):
+    """
+    A dead-letter entry.
+    """
+    if isinstance(record, InvalidJSON):
+        record = record.text
+    return {
+        'file': file,
+        'position': position,
+        'stage': stage,
+        'error': error,
+        'message': message,
+        'record': record,
+    }
+
+
+def clean_records(records, file):
+    """
+    Validate and clean (position, raw record) pairs from `file`.
+    Returns (recipes, rejections).
+    """
+    recipes, rejected = [], []
+    for position, recipe_data in records:
+        try:
+            validate_record(recipe_data)
+        except RecordError as e:
+            rejected.append(rejection(file, position, 'validate', e.code, e.message, recipe_data))
+            continue
+        recipe = build_recipe(recipe_data)
+        # Where the recipe came from, should the database refuse it
+        recipe._source = (file, position)
+        recipes.append(recipe)
+    return recipes, rejected
+
+
+class LoadReport:
+    """
+    Rejections by error, rows written and seconds spent per stage of a load.
+    Thread-safe, since writer threads report write time and failures.
+    Stage times are summed over worker processes and writer threads, so
+    they can add up to more than the elapsed time.
+    """
+    def __init__(self, dead_letter=None):
+        self.dead_letter = dead_letter
+        self.errors = Counter()
+        self.written = Counter()
+        self.seconds = Counter({stage: 0.0 for stage in STAGES})
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def rejected(self):
+        return sum(self.errors.values())
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.seconds[name] += seconds
+
+    def add_written(self, counts):
+        with self._lock:
+            self.written.update(counts)
+
+    def reject(self, entries):
+        if not entries:
+            return
+        with self._lock:
+            for entry in entries:
+                self.errors[entry['error']] += 1
+            if self.dead_letter is None:
+                return
+            if self._file is None:
+                self._file = open(self.dead_letter, 'a', encoding='utf-8')
+            for entry in entries:
+                self._file.write(json.dumps(entry, ensure_ascii=False, default=str))
+                self._file.write('\n')
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self):
+        return {
+            'written': dict(self.written),
+            'rejected': self.rejected,
+            'errors': dict(self.errors.most_common()),
+            'seconds': {stage: round(seconds, 3) for stage, seconds in self.seconds.items()},
+            'dead_letter': str(self.dead_letter) if self.dead_letter and self.rejected else None,
+        }
+
+
+class ReportingWrite:
+    """
+    Wraps a loader write function (bulk_insert, copy_insert, sync_batch):
+    times it as the write stage and, when the database rejects the batch
+    for its data, writes the recipes one by one and diverts the failing
+    ones to the report.
+    """
+    isolated_errors = (DataError, IntegrityError)
+
+    def __init__(self, write, report):
+        self.write = write
+        self.report = report
+        self.__name__ = write.__name__
+
+    def __call__(self, recipes, using='default'):
+        with self.report.stage('write'):
+            try:
+                counts = self.write(recipes, using=using)
+            except self.isolated_errors:
+                counts = self.write_each(recipes, using)
+        self.report.add_written(counts)
+        return counts
+
+    def write_each(self, recipes, using):
+        counts, rejected = Counter(), []
+        for recipe in recipes:
+            # A failed write rolled back, so it may have left a stale pk behind
+            recipe.pk = None
+            try:
+                counts.update(self.write([recipe], using=using))
+            except self.isolated_errors as e:
+                file, position = getattr(recipe, '_source', (None, None))
+                record = {name: getattr(recipe, name) for name in CONTENT_FIELDS}
+                message = str(e).strip().split('\n')[0]
+                rejected.append(rejection(file, position, 'write', 'write_error', message, record))
+        self.report.reject(rejected)
+        return counts
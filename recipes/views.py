@@ -1,170 +1,338 @@
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import generics, status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
-import re
+from .batch import parse_specs, run_batch
+from .cache import CachedResponseMixin, get_catalog_version
+from .export import DEFAULT_CHUNK_SIZE, EXPORT_CONTENT_TYPES, export_queryset, iter_export
+from .facets import compute_facets, load_facet_rollup
+from .filters import RecipeFilter
+from .metrics import registry, timer
 from .models import Recipe
-from .serializers import RecipeSerializer
+from .pagination import RecipeCursorPagination, RecipePagination, RecipeSearchPagination
+from .serializers import (
+    FastRecipeSerializer,
+    RecipeSerializer,
+    RecipeSummarySerializer,
+    fetch_columns,
+    parse_selected_fields,
+)
+from .similarity import get_similarity_index
+from .snapshot import snapshot_search
+from .suggest import SUGGEST_DEFAULT_LIMIT, SUGGEST_KINDS, SUGGEST_MAX_LIMIT, get_suggest_index
 
 
-class RecipePagination(PageNumberPagination):
+def error_response(exc):
     """
-    Custom pagination class for recipes.
+    JSON error response for an APIException raised outside a DRF view.
     """
-    page_size = 10
-    page_size_query_param = 'limit'
-    max_page_size = 100
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    return JsonResponse(detail, status=exc.status_code, safe=False)
 
 
-class RecipeListView(generics.ListAPIView):
+class RecipeFieldsMixin:
+    """
+    Sparse fieldsets for recipe views.
+
+    ?fields=a,b returns only those fields and ?exclude=a,b drops fields from
+    the full record; both accept any RecipeSerializer field. Without either,
+    the view's own serializer_class decides. Only the columns needed for the
+    selected fields are fetched from the database.
+
+    With fast_serialization enabled, rows are fetched with .values() and
+    turned into dicts by FastRecipeSerializer; use serialize_page() instead
+    of get_serializer() for those views.
+    """
+    # Ordering/pagination keys, fetched even when not serialized
+    always_fetch = ('id', 'title', 'rating')
+    fast_serialization = False
+
+    def get_selected_fields(self):
+        """
+        Returns the requested field names, or None when no selection was made.
+        """
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = parse_selected_fields(self.request.query_params)
+        return self._selected_fields
+
+    def get_serializer_class(self):
+        if self.get_selected_fields() is not None:
+            return RecipeSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        selected = self.get_selected_fields()
+        if selected is not None:
+            kwargs['fields'] = selected
+        return super().get_serializer(*args, **kwargs)
+
+    def serialize_page(self, page):
+        with timer():
+            if self.fast_serialization:
+                serializer = FastRecipeSerializer.compile(self.get_serializer_class(), self.get_selected_fields())
+                return serializer.serialize(page)
+            return self.get_serializer(page, many=True).data
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        columns = fetch_columns(self.get_serializer_class(), self.get_selected_fields(), self.always_fetch)
+        if self.fast_serialization:
+            return queryset.values(*columns)
+        return queryset.only(*columns)
+
+
+class RecipeListView(CachedResponseMixin, RecipeFieldsMixin, generics.ListAPIView):
     """
     GET /api/recipes
     Returns paginated list of recipes sorted by rating (descending).
-    Query params: page, limit
+    Query params: page, limit, fields, exclude
+    Pass cursor (empty for the first page) to switch to keyset pagination,
+    which keeps deep pages as fast as the first one.
     """
     queryset = Recipe.objects.all().order_by('-rating', 'title')
-    serializer_class = RecipeSerializer
+    serializer_class = RecipeSummarySerializer
     pagination_class = RecipePagination
+    fast_serialization = True
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
+
+        if RecipeCursorPagination.cursor_query_param in request.query_params:
+            paginator = RecipeCursorPagination()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            return paginator.get_paginated_response(self.serialize_page(page))
+
         page = self.paginate_queryset(queryset)
 
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            paginated_response = self.get_paginated_response(serializer.data)
+            data = self.serialize_page(page)
+            paginated_response = self.get_paginated_response(data)
 
             # Custom response format
             return Response({
                 'page': int(request.GET.get('page', 1)),
                 'limit': int(request.GET.get('limit', 10)),
                 'total': paginated_response.data['count'],
-                'data': serializer.data
+                'total_strategy': self.paginator.page.paginator.count_strategy,
+                'data': data
             })
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.serialize_page(queryset))
 
 
-class RecipeSearchView(generics.ListAPIView):
+class RecipeDetailView(RecipeFieldsMixin, generics.RetrieveAPIView):
+    """
+    GET /api/recipes/<id>
+    Returns the full record for a single recipe.
+    Query params: fields, exclude
+    """
+    queryset = Recipe.objects.all()
+    serializer_class = RecipeSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        with timer():
+            data = self.get_serializer(instance).data
+        return Response(data)
+
+
+class RecipeSimilarView(RecipeFieldsMixin, generics.GenericAPIView):
+    """
+    GET /api/recipes/<id>/similar
+    Returns the recipes most similar to this one, best first, each with its
+    cosine `score`. Neighbours are read from the index built by
+    `manage.py build_similarity` (see recipes.similarity), so a request is
+    one index lookup plus one query for the neighbours' rows. Recipes added
+    since the last build are not in the index (404).
+    Query params: limit (default 10, at most the index's K), fields, exclude
+    """
+    queryset = Recipe.objects.all()
+    serializer_class = RecipeSummarySerializer
+    pagination_class = None
+    fast_serialization = True
+    default_limit = 10
+
+    def get_limit(self, maximum):
+        raw = self.request.query_params.get('limit')
+        if raw is None:
+            return min(self.default_limit, maximum)
+        try:
+            limit = int(raw)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= maximum:
+            raise ValidationError({'limit': f'Must be an integer between 1 and {maximum}.'})
+        return limit
+
+    def get(self, request, pk, *args, **kwargs):
+        index = get_similarity_index()
+        limit = self.get_limit(index.k)
+        neighbors = index.similar(pk, limit)
+        if neighbors is None:
+            raise NotFound(f'Recipe {pk} is not in the similarity index.')
+
+        columns = fetch_columns(self.get_serializer_class(), self.get_selected_fields(), self.always_fetch)
+        queryset = self.get_queryset().filter(pk__in=[recipe_id for recipe_id, _ in neighbors]).values(*columns)
+        rows = {row['id']: row for row in queryset}
+        # Recipes deleted since the index was built are skipped
+        ranked = [(rows[recipe_id], score) for recipe_id, score in neighbors if recipe_id in rows]
+        data = self.serialize_page([row for row, _ in ranked])
+        for item, (_, score) in zip(data, ranked):
+            item['score'] = round(score, 4)
+        return Response({'id': pk, 'limit': limit, 'data': data})
+
+
+class RecipeSearchView(CachedResponseMixin, RecipeFieldsMixin, generics.ListAPIView):
     """
     GET /api/recipes/search
-    Search recipes with filters:
-    - calories: supports operators (e.g., <=400, >=200, =300)
+    Search recipes with filters (see RecipeFilter):
+    - calories, protein, carbohydrates, fat: support operators (e.g., <=400, >=200, =300)
     - title: partial match (case-insensitive)
     - cuisine: partial match (case-insensitive)
-    - total_time: supports operators (e.g., <=60, >=30)
+    - cuisine_in, continent_in: comma-separated exact values
+    - total_time, prep_time, cook_time: support operators (e.g., <=60, >=30)
     - rating: supports operators (e.g., >=4.5, <=5.0)
+    - q: full-text search over title, cuisine and description, ranked by relevance
+    - sort: comma-separated ordering, e.g. sort=-rating,total_time
+    Numeric filters may be repeated to combine bounds (total_time>=30&total_time<=60).
+    Paginated with page/limit; at most RecipeSearchPagination.max_results
+    matches are reachable. total=false skips the result count.
+    fields/exclude select the returned fields as on the list endpoint.
+    With RECIPES_SNAPSHOT enabled, filters the in-memory catalog snapshot
+    can evaluate are answered from it (see recipes.snapshot).
     """
-    serializer_class = RecipeSerializer
-
-    def parse_operator_value(self, param_value):
-        """
-        Parse parameter value with operator.
-        Returns (operator, value) tuple.
-        Supported operators: <=, >=, <, >, =
-        """
-        match = re.match(r'^(<=|>=|<|>|=)?(.+)$', str(param_value).strip())
-        if match:
-            operator = match.group(1) or '='
-            value = match.group(2).strip()
-            return operator, value
-        return '=', param_value
-
-    def get_queryset(self):
-        queryset = Recipe.objects.all()
-
-        # Filter by calories (from nutrients JSONB field)
-        calories_param = self.request.query_params.get('calories', None)
-        if calories_param:
-            operator, value = self.parse_operator_value(calories_param)
-            try:
-                calories_value = float(value.replace('kcal', '').strip())
-
-                # Query JSONB field for calories
-                # Strip " kcal" from the value before casting
-                if operator == '<=':
-                    queryset = queryset.extra(
-                        where=["CAST(REPLACE(nutrients->>'calories', ' kcal', '') AS FLOAT) <= %s"],
-                        params=[calories_value]
-                    )
-                elif operator == '>=':
-                    queryset = queryset.extra(
-                        where=["CAST(REPLACE(nutrients->>'calories', ' kcal', '') AS FLOAT) >= %s"],
-                        params=[calories_value]
-                    )
-                elif operator == '<':
-                    queryset = queryset.extra(
-                        where=["CAST(REPLACE(nutrients->>'calories', ' kcal', '') AS FLOAT) < %s"],
-                        params=[calories_value]
-                    )
-                elif operator == '>':
-                    queryset = queryset.extra(
-                        where=["CAST(REPLACE(nutrients->>'calories', ' kcal', '') AS FLOAT) > %s"],
-                        params=[calories_value]
-                    )
-                elif operator == '=':
-                    queryset = queryset.extra(
-                        where=["CAST(REPLACE(nutrients->>'calories', ' kcal', '') AS FLOAT) = %s"],
-                        params=[calories_value]
-                    )
-            except (ValueError, TypeError):
-                pass
-
-        # Filter by title (partial match)
-        title_param = self.request.query_params.get('title', None)
-        if title_param:
-            queryset = queryset.filter(title__icontains=title_param)
-
-        # Filter by cuisine (partial match)
-        cuisine_param = self.request.query_params.get('cuisine', None)
-        if cuisine_param:
-            queryset = queryset.filter(cuisine__icontains=cuisine_param)
-
-        # Filter by total_time
-        total_time_param = self.request.query_params.get('total_time', None)
-        if total_time_param:
-            operator, value = self.parse_operator_value(total_time_param)
-            try:
-                time_value = int(value)
-                if operator == '<=':
-                    queryset = queryset.filter(total_time__lte=time_value)
-                elif operator == '>=':
-                    queryset = queryset.filter(total_time__gte=time_value)
-                elif operator == '<':
-                    queryset = queryset.filter(total_time__lt=time_value)
-                elif operator == '>':
-                    queryset = queryset.filter(total_time__gt=time_value)
-                elif operator == '=':
-                    queryset = queryset.filter(total_time=time_value)
-            except (ValueError, TypeError):
-                pass
-
-        # Filter by rating
-        rating_param = self.request.query_params.get('rating', None)
-        if rating_param:
-            operator, value = self.parse_operator_value(rating_param)
-            try:
-                rating_value = float(value)
-                if operator == '<=':
-                    queryset = queryset.filter(rating__lte=rating_value)
-                elif operator == '>=':
-                    queryset = queryset.filter(rating__gte=rating_value)
-                elif operator == '<':
-                    queryset = queryset.filter(rating__lt=rating_value)
-                elif operator == '>':
-                    queryset = queryset.filter(rating__gt=rating_value)
-                elif operator == '=':
-                    queryset = queryset.filter(rating=rating_value)
-            except (ValueError, TypeError):
-                pass
-
-        return queryset.order_by('-rating', 'title')
+    queryset = Recipe.objects.all().order_by('-rating', 'title')
+    serializer_class = RecipeSummarySerializer
+    pagination_class = RecipeSearchPagination
+    filterset_class = RecipeFilter
+    fast_serialization = True
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        columns = fetch_columns(self.get_serializer_class(), self.get_selected_fields(), self.always_fetch)
+        queryset = snapshot_search(request.query_params, Recipe.objects.values(*columns))
+        if queryset is None:
+            queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.serialize_page(page))
+
+
+class RecipeBatchSearchView(RecipeFieldsMixin, generics.GenericAPIView):
+    """
+    POST /api/recipes/search/batch
+    Runs up to MAX_QUERIES searches in one request and one database round
+    trip. Body: {"queries": [{"cuisine_in": "Italian", "total_time": "<=30",
+    "limit": 5}, ...]}; each object takes the search parameters plus page
+    and limit. Results are returned in the same order, without totals.
+    fields/exclude (query params) apply to every result.
+    """
+    queryset = Recipe.objects.all().order_by('-rating', 'title')
+    serializer_class = RecipeSummarySerializer
+    pagination_class = None
+    fast_serialization = True
 
+    def post(self, request, *args, **kwargs):
+        specs = parse_specs(request.data)
+        columns = fetch_columns(self.get_serializer_class(), self.get_selected_fields(), self.always_fetch)
+        results = []
+        for spec, (rows, has_next) in zip(specs, run_batch(specs, self.get_queryset(), columns)):
+            results.append({
+                'page': spec.page,
+                'limit': spec.limit,
+                'has_next': has_next,
+                'data': self.serialize_page(rows),
+            })
+        return Response({'results': results})
+
+
+class RecipeFacetsView(CachedResponseMixin, generics.GenericAPIView):
+    """
+    GET /api/recipes/facets
+    Counts by cuisine, continent and rating bucket, plus calories and
+    total_time histograms, for the recipes matching the search filters.
+    Without filters the counts come from the precomputed rollup when it is
+    current (`source` is "rollup"), otherwise they are computed ("live").
+    """
+    queryset = Recipe.objects.all()
+    filterset_class = RecipeFilter
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        facets, source = None, 'rollup'
+        if not queryset.query.where:
+            facets = load_facet_rollup(get_catalog_version())
+        if facets is None:
+            facets, source = compute_facets(queryset), 'live'
         return Response({
-            'data': serializer.data
+            'total': sum(bucket['count'] for bucket in facets['cuisine']),
+            'source': source,
+            'facets': facets,
         })
+
+
+class RecipeSuggestView(View):
+    """
+    GET /api/recipes/suggest
+    Typeahead suggestions for the search box: the best-rated distinct
+    titles and cuisines with a word starting with q, answered from the
+    in-process prefix index (see recipes.suggest) without a database query.
+    Query params: q, limit (default 8, max 20), type (title or cuisine;
+    both by default)
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '')
+        kind = request.GET.get('type')
+        if kind is not None and kind not in SUGGEST_KINDS:
+            return JsonResponse({'type': f'Must be one of: {", ".join(SUGGEST_KINDS)}'}, status=400)
+        try:
+            limit = int(request.GET.get('limit', SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+            return JsonResponse({'limit': f'Must be an integer between 1 and {SUGGEST_MAX_LIMIT}.'}, status=400)
+
+        kinds = SUGGEST_KINDS if kind is None else (kind,)
+        results = get_suggest_index().suggest(query, kinds, limit)
+        return JsonResponse({'q': query, **results})
+
+
+class RecipeExportView(View):
+    """
+    GET /api/recipes/export
+    Streams every matching recipe as NDJSON (default) or CSV (format=csv),
+    in id order. Accepts the search filters and fields/exclude; there is no
+    pagination.
+    """
+    http_method_names = ['get', 'head', 'options']
+    chunk_size = DEFAULT_CHUNK_SIZE
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'ndjson')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return JsonResponse({'format': f'Must be one of: {", ".join(EXPORT_CONTENT_TYPES)}'}, status=400)
+        try:
+            fields = parse_selected_fields(request.GET)
+            queryset = export_queryset(request.GET, fields, request=request)
+        except APIException as exc:
+            return error_response(exc)
+
+        response = StreamingHttpResponse(
+            iter_export(queryset.iterator(chunk_size=self.chunk_size), export_format, fields, self.chunk_size),
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="recipes.{export_format}"'
+        return response
+
+
+class MetricsView(View):
+    """
+    GET /metrics
+    Per-endpoint request metrics of this process in the Prometheus text format.
+    """
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type=self.content_type)
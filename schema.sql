@@ -22,6 +22,12 @@ CREATE TABLE IF NOT EXISTS recipes (
     serves VARCHAR(100),
     nutrients JSONB,
 
+    -- Numeric copies of nutrients->>'calories' etc. so range filters can use indexes
+    calories_kcal DOUBLE PRECISION,
+    protein_g DOUBLE PRECISION,
+    carbohydrates_g DOUBLE PRECISION,
+    fat_g DOUBLE PRECISION,
+
     -- Additional fields from JSON data
     continent VARCHAR(255),
     country_state VARCHAR(255),
@@ -29,6 +35,12 @@ CREATE TABLE IF NOT EXISTS recipes (
     ingredients JSONB,
     instructions JSONB,
 
+    -- SHA-256 of the source fields, used by load_recipes --sync
+    content_hash VARCHAR(64),
+
+    -- Weighted tsvector over title/cuisine/description, maintained by trigger
+    search_vector TSVECTOR,
+
     -- Timestamps
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -38,11 +50,40 @@ CREATE TABLE IF NOT EXISTS recipes (
 CREATE INDEX IF NOT EXISTS idx_recipes_rating ON recipes(rating DESC NULLS LAST);
 CREATE INDEX IF NOT EXISTS idx_recipes_cuisine ON recipes(cuisine);
 CREATE INDEX IF NOT EXISTS idx_recipes_total_time ON recipes(total_time);
+CREATE INDEX IF NOT EXISTS idx_recipes_url ON recipes(url);
+CREATE INDEX IF NOT EXISTS idx_recipes_content_hash ON recipes(content_hash);
+CREATE INDEX IF NOT EXISTS idx_recipes_calories_kcal ON recipes(calories_kcal);
+CREATE INDEX IF NOT EXISTS idx_recipes_protein_g ON recipes(protein_g);
+CREATE INDEX IF NOT EXISTS idx_recipes_carbohydrates_g ON recipes(carbohydrates_g);
+CREATE INDEX IF NOT EXISTS idx_recipes_fat_g ON recipes(fat_g);
 CREATE INDEX IF NOT EXISTS idx_recipes_title ON recipes USING gin(to_tsvector('english', title));
 
+-- Trigram indexes serving case-insensitive substring search (title/cuisine ILIKE '%x%')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_recipes_title_trgm ON recipes USING gin(UPPER(title) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_recipes_cuisine_trgm ON recipes USING gin(UPPER(cuisine) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_recipes_search_vector ON recipes USING gin(search_vector);
+
 -- Create index on JSONB nutrients field for calories lookup
 CREATE INDEX IF NOT EXISTS idx_recipes_nutrients ON recipes USING gin(nutrients);
 
+-- Keep search_vector up to date
+CREATE OR REPLACE FUNCTION update_search_vector_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.cuisine, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER update_recipes_search_vector
+    BEFORE INSERT OR UPDATE ON recipes
+    FOR EACH ROW
+    EXECUTE FUNCTION update_search_vector_column();
+
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -58,6 +99,47 @@ CREATE TRIGGER update_recipes_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Catalog-wide facet counts, rebuilt after each data load
+CREATE TABLE IF NOT EXISTS recipe_facet_counts (
+    facet VARCHAR(50) NOT NULL,
+    position INTEGER NOT NULL,
+    value VARCHAR(255),
+    lower DOUBLE PRECISION,
+    upper DOUBLE PRECISION,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (facet, position)
+);
+
+-- Refresh the cuisine facet
+-- DELETE FROM recipe_facet_counts WHERE facet = 'cuisine';
+-- INSERT INTO recipe_facet_counts (facet, position, value, count)
+-- SELECT 'cuisine', ROW_NUMBER() OVER (ORDER BY COUNT(*) DESC, cuisine NULLS LAST) - 1, cuisine, COUNT(*)
+-- FROM recipes
+-- GROUP BY cuisine;
+
+-- Normalized ingredient index, filled by load_recipes
+CREATE TABLE IF NOT EXISTS recipe_ingredients_index (
+    id BIGSERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    tokens VARCHAR(255)[] NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ingredient_tokens ON recipe_ingredients_index USING GIN (tokens);
+
+CREATE TABLE IF NOT EXISTS recipe_ingredient_links (
+    id BIGSERIAL PRIMARY KEY,
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    ingredient_id BIGINT NOT NULL REFERENCES recipe_ingredients_index(id) ON DELETE CASCADE,
+    UNIQUE (recipe_id, ingredient_id)
+);
+CREATE INDEX IF NOT EXISTS idx_ingredient_links_ingredient ON recipe_ingredient_links(ingredient_id, recipe_id);
+
+-- Recipes with both chicken and rice
+-- SELECT r.id, r.title FROM recipes r
+-- WHERE EXISTS (SELECT 1 FROM recipe_ingredient_links l JOIN recipe_ingredients_index i ON i.id = l.ingredient_id
+--               WHERE l.recipe_id = r.id AND i.tokens @> ARRAY['chicken']::varchar[])
+--   AND EXISTS (SELECT 1 FROM recipe_ingredient_links l JOIN recipe_ingredients_index i ON i.id = l.ingredient_id
+--               WHERE l.recipe_id = r.id AND i.tokens @> ARRAY['rice']::varchar[]);
+
 -- Sample query to verify schema
 -- SELECT column_name, data_type, is_nullable
 -- FROM information_schema.columns
@@ -72,10 +154,10 @@ CREATE TRIGGER update_recipes_updated_at
 -- ORDER BY rating DESC NULLS LAST, title
 -- LIMIT 10;
 
--- Search recipes by calories (from JSONB)
--- SELECT id, title, rating, nutrients->>'calories' as calories
+-- Search recipes by calories
+-- SELECT id, title, rating, calories_kcal
 -- FROM recipes
--- WHERE CAST(REPLACE(nutrients->>'calories', ' kcal', '') AS FLOAT) <= 400
+-- WHERE calories_kcal <= 400
 -- ORDER BY rating DESC;
 
 -- Search with multiple filters
@@ -84,7 +166,7 @@ CREATE TRIGGER update_recipes_updated_at
 -- WHERE cuisine ILIKE '%southern%'
 --   AND rating >= 4.5
 --   AND total_time <= 120
---   AND CAST(REPLACE(nutrients->>'calories', ' kcal', '') AS FLOAT) <= 400
+--   AND calories_kcal <= 400
 -- ORDER BY rating DESC, title;
 
 -- Count recipes by cuisine
@@ -63,7 +63,7 @@ def test_recipe_search():
 
     if response.status_code == 200:
         data = response.json()
-        print(f"Results found: {len(data.get('data', []))}")
+        print(f"Results found: {data.get('total')}")
         if data.get('data'):
             print("\nFirst 3 results:")
             for recipe in data['data'][:3]:
@@ -77,7 +77,7 @@ def test_recipe_search():
 
     if response.status_code == 200:
         data = response.json()
-        print(f"Results found: {len(data.get('data', []))}")
+        print(f"Results found: {data.get('total')}")
         if data.get('data'):
             print("\nFirst 3 results:")
             for recipe in data['data'][:3]:
@@ -88,13 +88,13 @@ def test_recipe_search():
     print("Test 3: Search by calories<=400 and rating>=4.5")
     response = requests.get(
         f"{BASE_URL}/recipes/search",
-        params={'calories': '<=400', 'rating': '>=4.5'}
+        params={'calories': '<=400', 'rating': '>=4.5', 'fields': 'id,title,rating,nutrients'}
     )
     print(f"Status Code: {response.status_code}")
 
     if response.status_code == 200:
         data = response.json()
-        print(f"Results found: {len(data.get('data', []))}")
+        print(f"Results found: {data.get('total')}")
         if data.get('data'):
             print("\nFirst 3 results:")
             for recipe in data['data'][:3]:
@@ -114,7 +114,7 @@ def test_recipe_search():
 
     if response.status_code == 200:
         data = response.json()
-        print(f"Results found: {len(data.get('data', []))}")
+        print(f"Results found: {data.get('total')}")
         if data.get('data'):
             print("\nFirst 3 results:")
             for recipe in data['data'][:3]:
@@ -128,14 +128,15 @@ def test_recipe_search():
         params={
             'title': 'pie',
             'calories': '<=400',
-            'rating': '>=4.5'
+            'rating': '>=4.5',
+            'fields': 'id,title,rating,nutrients'
         }
     )
     print(f"Status Code: {response.status_code}")
 
     if response.status_code == 200:
         data = response.json()
-        print(f"Results found: {len(data.get('data', []))}")
+        print(f"Results found: {data.get('total')}")
         if data.get('data'):
             print("\nResults:")
             for recipe in data['data']: